@@ -0,0 +1,37 @@
+""" Layout
+
+	Pixel geometry for a board drawn as a grid of equal square cells with
+	gaps between them. Cell corners are worked out once, and finding the
+	cell under a pixel is a division rather than a search, so it costs
+	the same however big the board is.
+"""
+
+
+class GridLayout(object):
+	"""columns x rows cells of cell_size pixels, gap pixels apart, with the
+	top left cell's corner at (left, top)"""
+
+	def __init__(self, columns, rows, cell_size, gap, left, top):
+		self.columns = columns
+		self.rows = rows
+		self.cell_size = cell_size
+		self.pitch = cell_size + gap
+		self.left = left
+		self.top = top
+		self.lefts = [left + x * self.pitch for x in range(columns)]
+		self.tops = [top + y * self.pitch for y in range(rows)]
+
+	def left_top(self, x, y):
+		"""Pixel coordinates of the top left corner of cell x, y"""
+		return (self.lefts[x], self.tops[y])
+
+	def cell_at(self, px, py):
+		"""The cell x, y covering pixel px, py, or (None, None) if it is
+		off the grid or in a gap"""
+		x, offset_x = divmod(px - self.left, self.pitch)
+		y, offset_y = divmod(py - self.top, self.pitch)
+
+		if 0 <= x < self.columns and 0 <= y < self.rows and \
+		   offset_x < self.cell_size and offset_y < self.cell_size:
+			return (x, y)
+		return (None, None)
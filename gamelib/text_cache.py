@@ -0,0 +1,51 @@
+""" Text Cache
+
+	Keeps rendered text surfaces so labels that look the same from one
+	frame to the next are only rendered once. Surfaces are keyed by text,
+	font, colour and background, and the least recently used ones are
+	dropped once the cache is full.
+"""
+from collections import OrderedDict
+
+CACHESIZE = 64 # Surfaces kept by the shared cache
+
+
+class TextCache(object):
+	"""Rendered text surfaces, at most size of them"""
+
+	def __init__(self, size=CACHESIZE):
+		self.size = size
+		self._surfaces = OrderedDict()
+
+	def __len__(self):
+		return len(self._surfaces)
+
+	def render(self, font, text, color, bgcolor=None):
+		"""font.render(text, True, color, bgcolor), rendered only once.
+
+		The surface is shared, so draw it rather than drawing on it.
+		"""
+		key = (text, font, tuple(color), bgcolor and tuple(bgcolor))
+		surf = self._surfaces.pop(key, None)
+
+		if surf is None:
+			if bgcolor is None:
+				surf = font.render(text, True, color)
+			else:
+				surf = font.render(text, True, color, bgcolor)
+			while self._surfaces and len(self._surfaces) >= self.size:
+				self._surfaces.popitem(last=False)
+
+		self._surfaces[key] = surf
+		return surf
+
+	def clear(self):
+		self._surfaces.clear()
+
+
+_shared = TextCache()
+
+
+def render(font, text, color, bgcolor=None):
+	"""Render text through the cache shared by the whole game"""
+	return _shared.render(font, text, color, bgcolor)
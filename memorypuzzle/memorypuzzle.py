@@ -8,6 +8,10 @@
 import random, pygame, os, sys
 from pygame.locals import *
 
+# Helpers shared with the other games live in gamelib, next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gamelib import layout
+
 FPS = 30
 WINDOWWIDTH = 640
 WINDOWHEIGHT = 480
@@ -20,6 +24,8 @@ assert (BOARDWIDTH*BOARDHEIGHT)%2 == 0, \
 		'Board needs to have an even number of boxes for match pairs'
 XMARGIN = int((WINDOWWIDTH - (BOARDWIDTH * (BOXSIZE + GAPSIZE)))/2)
 YMARGIN = int((WINDOWHEIGHT - (BOARDHEIGHT * (BOXSIZE + GAPSIZE)))/2)
+BOXES = layout.GridLayout(BOARDWIDTH, BOARDHEIGHT, BOXSIZE, GAPSIZE,
+						  XMARGIN, YMARGIN)
 
 # RGB colors
 GRAY = (100, 100, 100)
@@ -194,23 +200,12 @@ def split_into_groups_of(groupsize, thelist):
 
 def left_top_coords_of_box(boxx, boxy):
 	"""Convert board coordinates to pixel coordinates"""
-	left = boxx * (BOXSIZE + GAPSIZE) + XMARGIN
-	top = boxy * (BOXSIZE + GAPSIZE) + YMARGIN
-	return (left, top)
+	return BOXES.left_top(boxx, boxy)
 
 
 def get_box_art_pixel(x, y):
-
-	for boxx in range(BOARDWIDTH):
-
-		for boxy in range(BOARDHEIGHT):
-			left, top = left_top_coords_of_box(boxx, boxy)
-			box_rect = pygame.Rect(left, top, BOXSIZE, BOXSIZE)
-
-			if box_rect.collidepoint(x, y):
-				return (boxx, boxy)
-
-	return (None, None)
+	"""Convert pixel coordinates to the board coordinates of the box there"""
+	return BOXES.cell_at(x, y)
 
 
 def draw_icon(shape, color, boxx, boxy):
@@ -0,0 +1,99 @@
+""" Animation
+
+	Schedules slide animations by the clock instead of by frames. Each
+	queued move gets a share of time; when moves pile up (quick key
+	presses, a solver's moves arriving) they are sped up so the screen is
+	never more than a fixed time behind the board. A slow frame doesn't
+	slow the animation down: the moves that should have finished during it
+	are reported finished together.
+
+	Long playbacks, like resetting a board after hundreds of moves, are
+	fitted into a fixed time by making most of the moves at once and only
+	animating the last few.
+"""
+from collections import deque
+
+SLIDETIME = 500 # Milliseconds for a slide with nothing queued behind it
+MAXLAG = 400 # Longest the screen may trail the board, in milliseconds
+
+
+def plan_playback(count, duration, slide_time, min_slide_time):
+	"""Fit count moves into duration milliseconds.
+
+	Slides are shortened as far as min_slide_time, and if that still isn't
+	enough the earliest moves are skipped. Returns (skipped, slide_time):
+	how many moves to make without animating, and how long each of the
+	others should take.
+	"""
+	if not count:
+		return 0, slide_time
+
+	slide_time = max(min_slide_time, min(slide_time, duration // count))
+	animated = min(count, duration // slide_time)
+	return count - animated, slide_time
+
+
+class SlideScheduler(object):
+	"""Queue of moves being animated, advanced with advance(now)"""
+
+	def __init__(self, slide_time=SLIDETIME, max_lag=MAXLAG):
+		self.slide_time = slide_time
+		self.max_lag = max_lag
+		self.progress = 0.0 # How far through the current move, 0 to 1
+		self._queue = deque() # (move, slide time) pairs
+		self._clock = None # Time of the last advance while busy
+
+	def __len__(self):
+		return len(self._queue)
+
+	@property
+	def current(self):
+		"""The move being animated, or None"""
+		return self._queue[0][0] if self._queue else None
+
+	def push(self, move, slide_time=None):
+		"""Queue a move, optionally with its own unhurried slide time"""
+		if slide_time is None:
+			slide_time = self.slide_time
+		self._queue.append((move, slide_time))
+
+	def clear(self):
+		"""Drop everything queued, returning the moves not yet finished"""
+		moves = [move for move, slide_time in self._queue]
+		self._queue.clear()
+		self.progress = 0.0
+		self._clock = None
+		return moves
+
+	def duration(self):
+		"""Milliseconds the current move takes, shortened when moves are
+		queued behind it so the whole queue fits in max_lag"""
+		move, slide_time = self._queue[0]
+		return max(1, min(slide_time, self.max_lag // len(self._queue)))
+
+	def advance(self, now):
+		"""Move the animation on to time now, in milliseconds.
+
+		Returns the moves that finished since the last call, in order.
+		"""
+		if self._clock is None:
+			self._clock = now
+		elapsed = now - self._clock
+		self._clock = now
+		finished = []
+
+		while self._queue:
+			duration = self.duration()
+			remaining = (1 - self.progress) * duration
+			if elapsed < remaining:
+				self.progress += elapsed / float(duration)
+				break
+
+			# Done with this one; the rest of the time goes to the next
+			elapsed -= remaining
+			finished.append(self._queue.popleft()[0])
+			self.progress = 0.0
+
+		if not self._queue:
+			self._clock = None
+		return finished
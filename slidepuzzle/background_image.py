@@ -0,0 +1,50 @@
+""" Background Image
+
+	Prepares the puzzle picture's tile atlas on a worker thread so the
+	window can open and the game can be played (with numbered tiles) while
+	a big photo is still being decoded and resized. PIL does its heavy
+	lifting without holding the GIL, so the game loop keeps running.
+"""
+import threading
+
+import picture_slicer
+import tile_cache
+
+
+def prepare_atlas(address, tile_size, board_width, board_height):
+	"""Path of the cached tile atlas for a picture, making it if needed"""
+	key = tile_cache.get_key(address, tile_size, board_width, board_height)
+	atlas_address = tile_cache.lookup(key)
+
+	if not atlas_address:
+		picture = picture_slicer.prepare_picture(address,
+												 (tile_size * board_width,
+												  tile_size * board_height))
+		atlas_address = tile_cache.store(key, picture,
+										 board_height, board_width)
+	return atlas_address
+
+
+class ImageJob(object):
+	"""A tile atlas being prepared on another thread.
+
+	Once done is set, atlas_address is the atlas to load, or error says
+	why there isn't one.
+	"""
+
+	def __init__(self, address, tile_size, board_width, board_height):
+		self.done = False
+		self.atlas_address = None
+		self.error = None
+		self._thread = threading.Thread(target=self._work,
+										args=(address, tile_size,
+											  board_width, board_height))
+		self._thread.daemon = True
+		self._thread.start()
+
+	def _work(self, *args):
+		try:
+			self.atlas_address = prepare_atlas(*args)
+		except Exception as error:
+			self.error = str(error)
+		self.done = True
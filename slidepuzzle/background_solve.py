@@ -0,0 +1,91 @@
+""" Background Solve
+
+	Runs a solve in its own process so the game loop keeps drawing and
+	handling events while the search works, and hands the moves back a
+	batch at a time. Big boards use realtime_solver, which confirms moves
+	row by row, so playback can start long before the solve is finished;
+	small boards are solved optimally and arrive all at once. A small board
+	that takes the optimal search more than OPTIMALNODES nodes is handed to
+	realtime_solver instead, so hard deals still answer in a fraction of a
+	second (with a longer solution) when there is no pattern database.
+"""
+import multiprocessing
+
+try:
+	from queue import Empty
+except ImportError:
+	from Queue import Empty
+
+import realtime_solver
+import solver
+
+OPTIMALSOLVETILES = 16 # Bigger boards are solved row by row
+OPTIMALNODES = 100000 # About half a second of optimal search
+
+
+def _work(tiles, width, height, results):
+	"""Worker process: put ('moves', [...]) batches, then ('done', None)"""
+	report = lambda moves: results.put(('moves', moves))
+	try:
+		moves = None
+		if width * height <= OPTIMALSOLVETILES:
+			moves, nodes = solver.search(tiles, width, height,
+										 max_nodes=OPTIMALNODES)
+		if moves is None:
+			realtime_solver.search(tiles, width, height, report=report)
+		else:
+			report(moves)
+		results.put(('done', None))
+	except Exception as error:
+		results.put(('error', str(error)))
+
+
+class SolveJob(object):
+	"""A solve running in another process.
+
+	Call poll() once a frame to collect any moves that have come in, and
+	cancel() to stop the search early.
+	"""
+
+	def __init__(self, board):
+		width = len(board)
+		height = len(board[0])
+		self.done = False
+		self.error = None
+		self._results = multiprocessing.Queue()
+		self._process = multiprocessing.Process(
+			target=_work,
+			args=(solver.board_to_tiles(board), width, height, self._results))
+		self._process.daemon = True
+		self._process.start()
+
+	def poll(self):
+		"""Return the moves that have arrived since the last poll"""
+		moves = []
+
+		while not self.done:
+			try:
+				kind, value = self._results.get_nowait()
+			except Empty:
+				if not self._process.is_alive() and self._results.empty():
+					# Died without saying so, e.g. killed from outside
+					self.done = True
+					self.error = self.error or 'Solver stopped'
+				break
+
+			if kind == 'moves':
+				moves.extend(value)
+			else:
+				self.done = True
+				if kind == 'error':
+					self.error = value
+				self._process.join()
+
+		return moves
+
+	def cancel(self):
+		"""Stop the search; moves not yet polled are thrown away"""
+		if self._process.is_alive():
+			self._process.terminate()
+		self._process.join()
+		self.done = True
@@ -0,0 +1,234 @@
+""" Slicer Benchmark
+
+	Times each stage of picture_slicer (get_picture, resize_picture,
+	crop_picture, slice_picture, save_sliced_picture, plus the fused
+	prepare_picture) on the bundled pictures for several grid and tile
+	sizes, and writes the results as JSON. Peak RSS is a process-wide high
+	water mark, so every stage runs in a fresh worker process that first
+	does only the stages making its input (none for prepare_picture).
+	peak_rss_kb is that process's peak at the end of the stage, and
+	setup_rss_kb its peak before the stage started.
+
+	Two result files can be compared, flagging stages that got slower,
+	grew memory further past their setup, or wrote more bytes, by more
+	than a threshold.
+
+	Usage: python bench_slicer.py [-o results.json] [--repeat 3]
+		   python bench_slicer.py --compare before.json after.json
+"""
+import argparse, json, multiprocessing, os, platform, shutil, sys, tempfile
+import time
+
+try:
+	import resource
+except ImportError:
+	resource = None # Not on Windows; peak RSS is left out
+
+import picture_slicer
+
+dirpath = os.path.abspath(os.path.dirname(__file__))
+
+PICTURES = ('sample_pic.jpg', 'emmapic.jpg', 'bam.jpg')
+GRIDS = (3, 4, 6)
+TILESIZES = (60, 120, 200)
+STAGES = ('get_picture', 'resize_picture', 'crop_picture', 'slice_picture',
+		  'save_sliced_picture', 'prepare_picture')
+THRESHOLD = 0.10 # Fraction a stage may worsen before it is flagged
+MINSECONDS = 0.002 # Slowdowns smaller than this are noise
+MINKB = 1024 # Memory growth changes smaller than this are noise
+
+
+def get_peak_rss():
+	"""Peak resident memory of this process so far, in KB"""
+	if resource is None:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == 'darwin':
+		peak //= 1024 # Reported in bytes there
+	return peak
+
+
+def get_folder_size(folder):
+	return sum(os.path.getsize(os.path.join(folder, name))
+			   for name in os.listdir(folder))
+
+
+def run_case(case):
+	"""Worker: time one stage for one picture, grid and tile size.
+
+	Returns the stage's result record.
+	"""
+	picture_name, grid, tile_size, name, repeat = case
+	address = os.path.join(dirpath, picture_name)
+	size = (tile_size * grid, tile_size * grid)
+	output = tempfile.mkdtemp()
+
+	def get_loaded(previous):
+		picture = picture_slicer.get_picture(address)
+		picture.load() # Opening alone only reads the header
+		return picture
+
+	# Each step makes the next one's input
+	pipeline = [
+		get_loaded,
+		lambda picture: picture_slicer.resize_picture(picture, size),
+		lambda picture: picture_slicer.crop_picture(picture, size),
+		lambda picture: picture_slicer.slice_picture(picture, grid, grid,
+													 size),
+		lambda tiles: picture_slicer.save_sliced_picture(tiles, grid, grid,
+														 output)]
+	if name == 'prepare_picture':
+		steps = [lambda previous: picture_slicer.prepare_picture(address,
+																 size)]
+	else:
+		steps = pipeline[:STAGES.index(name) + 1]
+
+	try:
+		result = None
+
+		for step in steps[:-1]:
+			result = step(result)
+		setup = get_peak_rss()
+		best = None
+
+		for attempt in range(repeat):
+			started = time.time()
+			steps[-1](result)
+			seconds = time.time() - started
+			if best is None or seconds < best:
+				best = seconds
+
+		peak = get_peak_rss()
+		written = get_folder_size(output)
+	finally:
+		shutil.rmtree(output, ignore_errors=True)
+
+	return {'picture': picture_name,
+			'grid': grid,
+			'tile_size': tile_size,
+			'stage': name,
+			'seconds': round(best, 6),
+			'peak_rss_kb': peak,
+			'setup_rss_kb': setup,
+			'bytes_written': written}
+
+
+def run(pictures=PICTURES, grids=GRIDS, tile_sizes=TILESIZES, repeat=3):
+	"""Benchmark every stage of every case, one fresh process at a time"""
+	cases = [(picture, grid, tile_size, stage, repeat)
+			 for picture in pictures
+			 for grid in grids
+			 for tile_size in tile_sizes
+			 for stage in STAGES]
+	# One worker so stages don't compete for the CPU, replaced every stage
+	pool = multiprocessing.Pool(1, maxtasksperchild=1)
+	results = []
+
+	try:
+		for record in pool.imap(run_case, cases):
+			results.append(record)
+			sys.stderr.write('%(picture)s %(grid)dx%(grid)d @%(tile_size)d '
+							 '%(stage)s\n' % record)
+		pool.close()
+	except BaseException:
+		pool.terminate()
+		raise
+	finally:
+		pool.join()
+
+	return {'meta': {'python': platform.python_version(),
+					 'pil': getattr(picture_slicer.Image, '__version__', None),
+					 'platform': platform.platform(),
+					 'repeat': repeat,
+					 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+			'results': results}
+
+
+def get_key(record):
+	return (record['picture'], record['grid'], record['tile_size'],
+			record['stage'])
+
+
+def get_growth(record):
+	"""KB the stage itself pushed peak RSS up by, or None if unknown"""
+	peak, setup = record.get('peak_rss_kb'), record.get('setup_rss_kb')
+	if peak is None or setup is None:
+		return None
+	return peak - setup
+
+
+def compare(before, after, threshold=THRESHOLD, min_seconds=MINSECONDS,
+			min_kb=MINKB):
+	"""Stages in after that are slower, use more memory or write more than
+	in before.
+
+	Returns a list of (key, measure, old value, new value).
+	"""
+	old = dict((get_key(record), record) for record in before['results'])
+	regressions = []
+
+	for record in after['results']:
+		key = get_key(record)
+		if key not in old:
+			continue
+
+		was, now = old[key]['seconds'], record['seconds']
+		if now > was * (1 + threshold) and now - was > min_seconds:
+			regressions.append((key, 'seconds', was, now))
+
+		was, now = get_growth(old[key]), get_growth(record)
+		if was is not None and now is not None and \
+		   now > was * (1 + threshold) and now - was > min_kb:
+			regressions.append((key, 'rss_growth_kb', was, now))
+
+		was, now = old[key]['bytes_written'], record['bytes_written']
+		if now > was * (1 + threshold):
+			regressions.append((key, 'bytes_written', was, now))
+
+	return regressions
+
+
+def main():
+	parser = argparse.ArgumentParser(
+		description='Benchmark the picture_slicer pipeline')
+	parser.add_argument('-o', '--output',
+						help='JSON file for the results (default stdout)')
+	parser.add_argument('--repeat', type=int, default=3,
+						help='runs per stage; the fastest counts')
+	parser.add_argument('--pictures', nargs='+', default=PICTURES)
+	parser.add_argument('--grids', type=int, nargs='+', default=GRIDS)
+	parser.add_argument('--tile-sizes', type=int, nargs='+',
+						default=TILESIZES)
+	parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+						help='flag regressions between two result files')
+	parser.add_argument('--threshold', type=float, default=THRESHOLD,
+						help='fraction a stage may worsen before it is '
+							 'flagged')
+	args = parser.parse_args()
+
+	if args.compare:
+		with open(args.compare[0]) as f:
+			before = json.load(f)
+		with open(args.compare[1]) as f:
+			after = json.load(f)
+
+		regressions = compare(before, after, args.threshold)
+		for key, measure, was, now in regressions:
+			print('REGRESSION %s %dx%d @%d %s: %s %s -> %s'
+				  % (key[0], key[1], key[1], key[2], key[3], measure,
+					 was, now))
+		print('%d regressions in %d stages'
+			  % (len(regressions), len(after['results'])))
+		sys.exit(1 if regressions else 0)
+
+	results = run(args.pictures, args.grids, args.tile_sizes, args.repeat)
+	text = json.dumps(results, indent=1, sort_keys=True)
+	if args.output:
+		with open(args.output, 'w') as f:
+			f.write(text + '\n')
+	else:
+		print(text)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,192 @@
+""" Slide Puzzle Engine
+
+	The game rules with no pygame or PIL attached: boards, moves,
+	scrambles, solved checks and move history. slidepuzzle.py draws on top
+	of this, and anything that only needs the rules (bulk simulations,
+	solver jobs, servers without a display) can import it directly.
+
+	Boards are lists of columns, board[x][y], with None for the blank, or a
+	packed_board.ColumnsView, which the functions here move in O(1).
+"""
+import random
+
+import packed_board
+import scrambler
+from solver import UP, DOWN, LEFT, RIGHT, goal_tiles
+
+OPPOSITE = {UP: DOWN, DOWN: UP, LEFT: RIGHT, RIGHT: LEFT}
+
+# One-letter names for moves written out as text
+LETTERS = {UP: 'u', DOWN: 'd', LEFT: 'l', RIGHT: 'r'}
+
+
+def get_starting_board(width, height):
+	"""Return a solved board"""
+	counter = 1
+	board = []
+
+	for x in range(width):
+		column = []
+
+		for y in range(height):
+			column.append(counter)
+			counter += width
+
+		board.append(column)
+		counter -= width * (height - 1) + width - 1
+
+	board[width - 1][height - 1] = None
+	return board
+
+
+def get_blank_position(board):
+	"""Return the x and y coordinates of the blank space"""
+	if isinstance(board, packed_board.ColumnsView):
+		return board.engine.blank_position()
+
+	for x in range(len(board)):
+
+		for y in range(len(board[0])):
+
+			if board[x][y] == None:
+				return (x, y)
+
+
+def make_move(board, move):
+	"""Makes desired move after its validity has been checked"""
+	if isinstance(board, packed_board.ColumnsView):
+		board.engine.move(move)
+		return
+
+	blankx, blanky = get_blank_position(board)
+
+	if move == UP:
+		board[blankx][blanky], board[blankx][blanky+1] = \
+		board[blankx][blanky+1], board[blankx][blanky]
+	elif move == DOWN:
+		board[blankx][blanky] = board[blankx][blanky-1]
+		board[blankx][blanky-1] = None
+	elif move == LEFT:
+		board[blankx][blanky] = board[blankx+1][blanky]
+		board[blankx+1][blanky] = None
+	elif move == RIGHT:
+		board[blankx][blanky] = board[blankx-1][blanky]
+		board[blankx-1][blanky] = None
+
+
+def is_valid_move(board, move):
+	#Checks to see if desired move is valid
+	if isinstance(board, packed_board.ColumnsView):
+		return board.engine.can_move(move)
+
+	blankx, blanky = get_blank_position(board)
+
+	if move == UP and blanky != len(board[0]) - 1:
+		return True
+	elif move == DOWN and blanky != 0:
+		return True
+	elif move == LEFT and blankx != len(board) - 1:
+		return True
+	elif move == RIGHT and blankx != 0:
+		return True
+	else:
+		return False
+
+
+def get_random_move(board, last_move=None, rng=random):
+	#Picks a random move while checking for validity"
+	# Start with a full list of all four moves
+	possible_moves = [UP, DOWN, LEFT, RIGHT]
+
+	# Remove moves from the list as they are disqualified
+	if last_move == UP or not is_valid_move(board, DOWN):
+		possible_moves.remove(DOWN)
+	if last_move == DOWN or not is_valid_move(board, UP):
+		possible_moves.remove(UP)
+	if last_move == LEFT or not is_valid_move(board, RIGHT):
+		possible_moves.remove(RIGHT)
+	if last_move == RIGHT or not is_valid_move(board, LEFT):
+		possible_moves.remove(LEFT)
+
+	# Return a random move from the list of remaining moves
+	return rng.choice(possible_moves)
+
+
+def get_random_moves(board, num_slides, rng=random):
+	"""Random slides from board that never undo the slide before.
+
+	board is left as it was; play the moves with make_move to follow them.
+	"""
+	board = packed_board.from_columns(board)
+	view = packed_board.ColumnsView(board)
+	sequence = []
+	last_move = None
+
+	for i in range(num_slides):
+		move = get_random_move(view, last_move, rng)
+		board.move(move)
+		sequence.append(move)
+		last_move = move
+
+	return sequence
+
+
+def is_solved(board):
+	"""Returns True if every tile is back where it started"""
+	width = len(board)
+	height = len(board[0])
+	return board == get_starting_board(width, height)
+
+
+class Game(object):
+	"""One game's board and the moves played on it since it was dealt"""
+
+	def __init__(self, width=4, height=4, tiles=None):
+		self.width = width
+		self.height = height
+		self.deal(tiles or goal_tiles(width, height))
+
+	def deal(self, tiles):
+		"""Start over from a row-major tuple with 0 for the blank"""
+		self.board = packed_board.from_tiles(tiles, self.width, self.height)
+		self.history = []
+
+	def new_game(self, min_distance=0, rng=random):
+		"""Deal a uniformly random solvable board"""
+		self.deal(scrambler.scramble(self.width, self.height, min_distance,
+									 rng))
+
+	def columns(self):
+		"""The board as slidepuzzle's list of columns"""
+		return packed_board.ColumnsView(self.board)
+
+	def slide(self, move):
+		"""Make a move if it is valid; returns whether it was made"""
+		if not self.board.can_move(move):
+			return False
+		self.board.move(move)
+		self.history.append(move)
+		return True
+
+	def play(self, moves):
+		"""Make a sequence of moves that are known to be valid"""
+		self.board.walk(moves)
+		self.history.extend(moves)
+
+	def undo(self):
+		"""Take back the last move and return it, or None if there is none"""
+		if not self.history:
+			return None
+		move = self.history.pop()
+		self.board.move(OPPOSITE[move])
+		return move
+
+	def reset(self):
+		"""Take back every move; returns the moves made to get there"""
+		moves = [OPPOSITE[move] for move in reversed(self.history)]
+		self.board.walk(moves)
+		self.history = []
+		return moves
+
+	def is_solved(self):
+		return self.board.is_solved()
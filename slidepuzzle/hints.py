@@ -0,0 +1,71 @@
+""" Hints
+
+	Answers "what should I slide next?" for slide puzzle boards. Every
+	solve is remembered state by state in a transposition table, so after
+	the first hint the rest of the way home is answered by lookups instead
+	of new searches. The table forgets its least recently used boards once
+	it reaches its memory cap.
+
+	The engine never searches itself: a board it doesn't know is solved
+	by a background_solve job, optimal where that finishes quickly and
+	best-known otherwise, and the job's moves are handed to remember().
+"""
+from collections import OrderedDict
+
+import packed_board
+
+ENTRYBYTES = 256 # Rough cost of one remembered board, for the memory cap
+
+
+class TranspositionTable(object):
+	"""Best-known (moves left, next move) per board, least recently used
+	first out once there are more than capacity boards"""
+
+	def __init__(self, capacity):
+		self.capacity = capacity
+		self._entries = OrderedDict()
+
+	def __len__(self):
+		return len(self._entries)
+
+	def get(self, key):
+		"""The entry for key, or None; counts as a use"""
+		entry = self._entries.pop(key, None)
+		if entry is not None:
+			self._entries[key] = entry
+		return entry
+
+	def put(self, key, distance, move):
+		"""Remember a move from key, keeping whichever route is shorter"""
+		entry = self._entries.pop(key, None)
+		if entry is None or distance < entry[0]:
+			entry = (distance, move)
+		self._entries[key] = entry
+
+		while len(self._entries) > self.capacity:
+			self._entries.popitem(last=False)
+
+
+class HintEngine(object):
+	"""Next-move hints backed by a TranspositionTable of solved boards"""
+
+	def __init__(self, memory=16 * 1024 * 1024):
+		self.table = TranspositionTable(max(1, memory // ENTRYBYTES))
+
+	def remember(self, board, moves):
+		"""Store every board along moves, which must solve board"""
+		board = board.copy()
+		entries = []
+
+		for distance, move in zip(range(len(moves), 0, -1), moves):
+			entries.append((board.copy(), distance, move))
+			board.move(move)
+
+		# Latest first out, so the boards the player reaches next stay longest
+		for key, distance, move in reversed(entries):
+			self.table.put(key, distance, move)
+
+	def lookup(self, board):
+		"""Remembered next move for a board of columns, or None"""
+		entry = self.table.get(packed_board.from_columns(board))
+		return entry[1] if entry else None
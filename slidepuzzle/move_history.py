@@ -0,0 +1,122 @@
+""" Move History
+
+	Records the moves played in a game one byte per move, with undo and
+	redo, and works out which of those moves still matter: a slide that is
+	straight away slid back, or a run of moves that comes back to a board
+	already seen, changes nothing and needn't be replayed.
+"""
+import packed_board
+from solver import UP, DOWN, LEFT, RIGHT, board_to_tiles
+
+# Opposite moves differ only in the lowest bit
+MOVES = (UP, DOWN, LEFT, RIGHT)
+CODES = dict((move, code) for code, move in enumerate(MOVES))
+
+
+def cancel_pairs(moves):
+	"""Drop every move that is immediately undone by the next one"""
+	kept = []
+
+	for move in moves:
+		if kept and CODES[kept[-1]] == CODES[move] ^ 1:
+			kept.pop()
+		else:
+			kept.append(move)
+
+	return kept
+
+
+def simplify(tiles, width, height, moves):
+	"""Cut every stretch of moves that comes back to a board already seen"""
+	board = packed_board.from_tiles(tiles, width, height)
+	states = [board.copy()] # Board after each kept move
+	seen = {states[0]: 0}
+	kept = []
+
+	for move in cancel_pairs(moves):
+		board.move(move)
+
+		if board in seen:
+			# Back where we were: drop everything since then
+			index = seen[board]
+			for state in states[index + 1:]:
+				del seen[state]
+			del states[index + 1:]
+			del kept[index:]
+		else:
+			kept.append(move)
+			states.append(board.copy())
+			seen[states[-1]] = len(kept)
+
+	return kept
+
+
+class MoveHistory(object):
+	"""Moves played since start, one byte each, with undo and redo.
+
+	Undone moves stay in the buffer past the cursor until redone or
+	overwritten by a new move.
+	"""
+
+	def __init__(self, start=None, width=None, height=None):
+		self.start = start
+		self.width = width
+		self.height = height
+		self._buffer = bytearray()
+		self._length = 0
+
+	@classmethod
+	def from_board(cls, board):
+		"""An empty history starting from a board of columns"""
+		return cls(board_to_tiles(board), len(board), len(board[0]))
+
+	def __len__(self):
+		return self._length
+
+	def __iter__(self):
+		for i in range(self._length):
+			yield MOVES[self._buffer[i]]
+
+	def moves(self):
+		return list(self)
+
+	def append(self, move):
+		"""Record a move, forgetting anything that could have been redone"""
+		del self._buffer[self._length:]
+		self._buffer.append(CODES[move])
+		self._length += 1
+
+	def extend(self, moves):
+		for move in moves:
+			self.append(move)
+
+	def undo(self):
+		"""Step back one move and return it, or None at the start.
+
+		The caller plays the opposite move to take it back.
+		"""
+		if not self._length:
+			return None
+		self._length -= 1
+		return MOVES[self._buffer[self._length]]
+
+	def redo(self):
+		"""Step forward over an undone move and return it, or None"""
+		if self._length == len(self._buffer):
+			return None
+		self._length += 1
+		return MOVES[self._buffer[self._length - 1]]
+
+	def clear(self):
+		del self._buffer[:]
+		self._length = 0
+
+	def simplified(self):
+		"""The moves with round trips taken out.
+
+		Loops are only found when the history knows its starting board;
+		otherwise just back-and-forth pairs are dropped.
+		"""
+		if self.start is None:
+			return cancel_pairs(self)
+		return simplify(self.start, self.width, self.height, self)
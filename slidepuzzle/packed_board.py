@@ -0,0 +1,318 @@
+""" Packed Boards
+
+	Compact slide puzzle positions for code that makes a lot of moves.
+	Boards of up to 16 cells are packed four bits per cell into a single
+	integer; bigger boards are kept in a flat bytearray. Both track the
+	blank's index instead of searching for it, look moves up in tables
+	built once per board size, and hash in constant time.
+
+	Cells are numbered row-major and hold tile numbers with 0 for the
+	blank, the same layout solver.py uses. ColumnsView wraps either kind so
+	that code written for slidepuzzle's lists of columns (board[x][y], with
+	None for the blank) keeps working.
+
+	Run this file to time raw move throughput.
+"""
+import random, time
+
+from solver import get_neighbours
+
+_tables = {}
+
+
+def get_tables(width, height):
+	"""Per-blank move tables for a board size, built once and shared"""
+	key = (width, height)
+	if key not in _tables:
+		neighbours = get_neighbours(width, height)
+		targets = [dict((move, new_blank) for new_blank, move in options)
+				   for options in neighbours]
+		_tables[key] = (neighbours, targets)
+	return _tables[key]
+
+
+class _Board(object):
+	"""Board methods that only need indexing, the blank and move tables"""
+
+	__slots__ = ()
+
+	def blank_position(self):
+		return (self.blank % self.width, self.blank // self.width)
+
+	def can_move(self, move):
+		return move in self._targets[self.blank]
+
+	def moves(self):
+		"""Valid moves from this position"""
+		return [move for new_blank, move in self._neighbours[self.blank]]
+
+	def is_solved(self):
+		size = self.width * self.height
+		return self.blank == size - 1 and \
+			   all(self[pos] == pos + 1 for pos in range(size - 1))
+
+	def to_columns(self):
+		return [[self[y * self.width + x] or None
+				 for y in range(self.height)] for x in range(self.width)]
+
+
+class PackedBoard(_Board):
+	"""A board of at most 16 cells packed four bits per cell into an int"""
+
+	__slots__ = ('width', 'height', 'state', 'blank', '_neighbours',
+				 '_targets')
+
+	def __init__(self, tiles, width, height):
+		assert width * height <= 16, "Board is too big to pack"
+		self.width = width
+		self.height = height
+		self.state = 0
+
+		for pos, tile in enumerate(tiles):
+			self.state |= tile << (4 * pos)
+
+		self.blank = list(tiles).index(0)
+		self._neighbours, self._targets = get_tables(width, height)
+
+	def __getitem__(self, pos):
+		return (self.state >> (4 * pos)) & 15
+
+	def __setitem__(self, pos, tile):
+		shift = 4 * pos
+		self.state = (self.state & ~(15 << shift)) | (tile << shift)
+		if tile == 0:
+			self.blank = pos
+
+	def __hash__(self):
+		return hash(self.state)
+
+	def __eq__(self, other):
+		return isinstance(other, PackedBoard) and self.state == other.state \
+			   and (self.width, self.height) == (other.width, other.height)
+
+	def __ne__(self, other):
+		return not self == other
+
+	def copy(self):
+		board = PackedBoard.__new__(PackedBoard)
+		board.width, board.height = self.width, self.height
+		board.state, board.blank = self.state, self.blank
+		board._neighbours, board._targets = self._neighbours, self._targets
+		return board
+
+	def to_tiles(self):
+		return tuple(self[pos] for pos in range(self.width * self.height))
+
+	def move(self, move):
+		"""Slide the tile next to the blank in the given direction"""
+		new_blank = self._targets[self.blank][move]
+		shift = 4 * new_blank
+		tile = (self.state >> shift) & 15
+		# The blank's cell is all zero bits, so xor both moves the tile in
+		# and clears the cell it came from
+		self.state ^= (tile << shift) | (tile << (4 * self.blank))
+		self.blank = new_blank
+
+	def walk(self, moves):
+		"""Make every move in moves; the fast path for bulk simulation"""
+		targets = self._targets
+		state = self.state
+		blank = self.blank
+
+		for move in moves:
+			new_blank = targets[blank][move]
+			shift = 4 * new_blank
+			tile = (state >> shift) & 15
+			state ^= (tile << shift) | (tile << (4 * blank))
+			blank = new_blank
+
+		self.state = state
+		self.blank = blank
+
+
+class ByteBoard(_Board):
+	"""A board of any size kept in a flat bytearray with a Zobrist hash"""
+
+	__slots__ = ('width', 'height', 'cells', 'blank', 'key', '_neighbours',
+				 '_targets', '_zobrist')
+
+	_zobrist_tables = {}
+
+	def __init__(self, tiles, width, height):
+		self.width = width
+		self.height = height
+		self.cells = bytearray(tiles)
+		self.blank = list(tiles).index(0)
+		self._neighbours, self._targets = get_tables(width, height)
+		self._zobrist = self._get_zobrist(width * height)
+		self.key = 0
+
+		for pos, tile in enumerate(self.cells):
+			self.key ^= self._zobrist[pos][tile]
+
+	@classmethod
+	def _get_zobrist(cls, size):
+		"""Random bits per (cell, tile), with nothing for the blank"""
+		if size not in cls._zobrist_tables:
+			rng = random.Random(size)
+			cls._zobrist_tables[size] = [
+				[0] + [rng.getrandbits(64) for tile in range(1, size)]
+				for pos in range(size)]
+		return cls._zobrist_tables[size]
+
+	def __getitem__(self, pos):
+		return self.cells[pos]
+
+	def __setitem__(self, pos, tile):
+		zobrist = self._zobrist[pos]
+		self.key ^= zobrist[self.cells[pos]] ^ zobrist[tile]
+		self.cells[pos] = tile
+		if tile == 0:
+			self.blank = pos
+
+	def __hash__(self):
+		return hash(self.key)
+
+	def __eq__(self, other):
+		return isinstance(other, ByteBoard) and self.key == other.key \
+			   and self.cells == other.cells and self.width == other.width
+
+	def __ne__(self, other):
+		return not self == other
+
+	def copy(self):
+		board = ByteBoard.__new__(ByteBoard)
+		board.width, board.height = self.width, self.height
+		board.cells, board.blank = bytearray(self.cells), self.blank
+		board.key = self.key
+		board._neighbours, board._targets = self._neighbours, self._targets
+		board._zobrist = self._zobrist
+		return board
+
+	def to_tiles(self):
+		return tuple(self.cells)
+
+	def move(self, move):
+		"""Slide the tile next to the blank in the given direction"""
+		self.walk((move,))
+
+	def walk(self, moves):
+		"""Make every move in moves; the fast path for bulk simulation"""
+		targets = self._targets
+		zobrist = self._zobrist
+		cells = self.cells
+		blank = self.blank
+		key = self.key
+
+		for move in moves:
+			new_blank = targets[blank][move]
+			tile = cells[new_blank]
+			cells[blank] = tile
+			cells[new_blank] = 0
+			key ^= zobrist[blank][tile] ^ zobrist[new_blank][tile]
+			blank = new_blank
+
+		self.blank = blank
+		self.key = key
+
+
+def from_tiles(tiles, width, height):
+	"""The most compact board type for a row-major tuple"""
+	if width * height <= 16:
+		return PackedBoard(tiles, width, height)
+	return ByteBoard(tiles, width, height)
+
+
+def from_columns(board):
+	"""The most compact board type for one of slidepuzzle's boards"""
+	width = len(board)
+	height = len(board[0])
+	tiles = [board[x][y] or 0 for y in range(height) for x in range(width)]
+	return from_tiles(tiles, width, height)
+
+
+class _Column(object):
+	"""One column of a ColumnsView"""
+
+	__slots__ = ('engine', 'x')
+
+	def __init__(self, engine, x):
+		self.engine = engine
+		self.x = x
+
+	def __len__(self):
+		return self.engine.height
+
+	def __getitem__(self, y):
+		if y < 0:
+			y += self.engine.height
+		if not 0 <= y < self.engine.height:
+			raise IndexError(y)
+		return self.engine[y * self.engine.width + self.x] or None
+
+	def __setitem__(self, y, tile):
+		self.engine[y * self.engine.width + self.x] = tile or 0
+
+	def __iter__(self):
+		return iter([self[y] for y in range(self.engine.height)])
+
+
+class ColumnsView(object):
+	"""Lets a packed board stand in for a list of columns.
+
+	board[x][y] reads and writes go straight through to the engine, and the
+	view compares equal to a list of columns holding the same tiles.
+	"""
+
+	def __init__(self, engine):
+		self.engine = engine
+
+	def __len__(self):
+		return self.engine.width
+
+	def __getitem__(self, x):
+		if x < 0:
+			x += self.engine.width
+		if not 0 <= x < self.engine.width:
+			raise IndexError(x)
+		return _Column(self.engine, x)
+
+	def __iter__(self):
+		return iter([self[x] for x in range(self.engine.width)])
+
+	def __eq__(self, other):
+		if isinstance(other, ColumnsView):
+			return self.engine == other.engine
+		return self.engine.to_columns() == other
+
+	def __ne__(self, other):
+		return not self == other
+
+	__hash__ = None
+
+
+def benchmark(count=1000000, width=4, height=4):
+	"""Time count random moves on a packed board and a byte board"""
+	rng = random.Random(0)
+	goal = list(range(1, width * height)) + [0]
+
+	for board in (PackedBoard(goal, width, height),
+				  ByteBoard(goal, width, height)):
+		# Build a valid random walk up front so only moves are timed
+		moves = []
+		blank = board.blank
+		neighbours = board._neighbours
+
+		for i in range(count):
+			blank, move = rng.choice(neighbours[blank])
+			moves.append(move)
+
+		started = time.time()
+		board.walk(moves)
+		elapsed = time.time() - started
+		print('%s: %.2f million moves per second'
+			  % (type(board).__name__, count / elapsed / 1e6))
+
+
+if __name__ == '__main__':
+	benchmark()
@@ -0,0 +1,363 @@
+""" Pattern Databases
+
+	Builds and loads additive disjoint pattern databases for the slide
+	puzzle solver. The tiles are split into groups, and for every placement
+	of a group's tiles the table stores how many slides of those tiles it
+	takes to bring them home, ignoring every other tile. Because only
+	slides of a group's own tiles are counted, the group values can be
+	added together and still never overestimate.
+
+	Tile numbers and goal cells follow get_starting_board in slidepuzzle.py:
+	tile t belongs in row-major cell t - 1 and the blank in the last cell.
+
+	File layout (all single bytes):
+		'SPDB', version, width, height, group count,
+		then for each group its tile count followed by its tiles,
+		then each group's table, one byte per placement.
+
+	Usage: python pattern_db.py [width height] [-o file] [-g 1,2,3/4,5,6]
+"""
+import argparse, mmap, os, sys, time
+from operator import itemgetter
+
+dirpath = os.path.abspath(os.path.dirname(__file__))
+
+MAGIC = b'SPDB'
+VERSION = 1
+UNSEEN = 255
+
+# Korf & Felner's 6-6-3 split of the 15 puzzle
+PARTITIONS = {
+	(4, 4): ((1, 5, 6, 9, 10, 13), (7, 8, 11, 12, 14, 15), (2, 3, 4)),
+}
+
+
+def default_partition(width, height, group_size=5):
+	"""Return the tile groups used for a board size"""
+	if (width, height) in PARTITIONS:
+		return PARTITIONS[(width, height)]
+
+	tiles = list(range(1, width * height))
+	return tuple(tuple(tiles[i:i + group_size])
+				 for i in range(0, len(tiles), group_size))
+
+
+def default_path(width, height):
+	"""Where the database for a board size is kept"""
+	return os.path.join(dirpath, 'pdb', '%dx%d.pdb' % (width, height))
+
+
+def table_size(cells, count):
+	"""Number of ways to place count distinct tiles on cells squares"""
+	size = 1
+
+	for i in range(count):
+		size *= cells - i
+
+	return size
+
+
+def rank_weights(cells, count):
+	"""Place values for rank(), one per tile in the group"""
+	weights = []
+
+	for i in range(count):
+		weights.append(table_size(cells - i - 1, count - i - 1))
+
+	return weights
+
+
+def rank(positions, weights):
+	"""Map distinct cell positions to a dense index below table_size"""
+	index = 0
+
+	for i, pos in enumerate(positions):
+		digit = pos
+
+		for j in range(i):
+			if positions[j] < pos:
+				digit -= 1
+		index += digit * weights[i]
+
+	return index
+
+
+def get_adjacent(width, height):
+	"""For every cell, the cells a tile there could slide into"""
+	adjacent = []
+
+	for cell in range(width * height):
+		x, y = cell % width, cell // width
+		cells = []
+		if y < height - 1:
+			cells.append(cell + width)
+		if y > 0:
+			cells.append(cell - width)
+		if x < width - 1:
+			cells.append(cell + 1)
+		if x > 0:
+			cells.append(cell - 1)
+		adjacent.append(tuple(cells))
+
+	return adjacent
+
+
+def get_masks(width, height):
+	"""Bit masks of the cells that can shift left and right by one column"""
+	full = (1 << (width * height)) - 1
+	left_col = 0
+
+	for y in range(height):
+		left_col |= 1 << (y * width)
+
+	right_col = left_col << (width - 1)
+	return full, full & ~right_col, full & ~left_col
+
+
+def _blank_region(start, free, width, masks):
+	"""Bit mask of the free cells the blank can reach from start"""
+	full, not_right, not_left = masks
+	region = start
+
+	while True:
+		grown = region | (((region & not_right) << 1) |
+						  ((region & not_left) >> 1) |
+						  (region << width) | (region >> width)) & free
+		if grown == region:
+			return region
+		region = grown
+
+
+def build_table(width, height, group, verbose=False):
+	"""Breadth-first search back from the goal for one group of tiles.
+
+	Slides of tiles outside the group are free, so a state is the group's
+	placement plus the region of cells the blank can wander through; the
+	region is named by its lowest cell.
+	"""
+	cells = width * height
+	count = len(group)
+	weights = rank_weights(cells, count)
+	adjacent = get_adjacent(width, height)
+	masks = get_masks(width, height)
+	full = masks[0]
+	table = bytearray([UNSEEN]) * table_size(cells, count)
+	seen = bytearray(len(table) * cells)
+
+	start = tuple(tile - 1 for tile in group)
+	occupied = 0
+	for pos in start:
+		occupied |= 1 << pos
+	region = _blank_region(1 << (cells - 1), full & ~occupied, width, masks)
+	frontier = [(start, region)]
+	seen[rank(start, weights) * cells +
+		 (region & -region).bit_length() - 1] = 1
+	distance = 0
+	filled = 0
+
+	while frontier:
+		following = []
+
+		for positions, region in frontier:
+			index = rank(positions, weights)
+			if table[index] == UNSEEN:
+				table[index] = distance
+				filled += 1
+
+			occupied = 0
+			for pos in positions:
+				occupied |= 1 << pos
+
+			for i, pos in enumerate(positions):
+
+				for cell in adjacent[pos]:
+					if not (region >> cell) & 1:
+						continue
+
+					# Slide the group tile on pos into the blank at cell
+					moved = positions[:i] + (cell,) + positions[i + 1:]
+					free = full & ~(occupied ^ (1 << pos) ^ (1 << cell))
+					moved_region = _blank_region(1 << pos, free, width, masks)
+					key = rank(moved, weights) * cells + \
+						  (moved_region & -moved_region).bit_length() - 1
+					if not seen[key]:
+						seen[key] = 1
+						following.append((moved, moved_region))
+
+		if verbose:
+			sys.stderr.write('  depth %d: %d states, %d of %d placements\n'
+							 % (distance, len(frontier), filled, len(table)))
+		frontier = following
+		distance += 1
+
+	return table
+
+
+def build(width, height, groups=None, address=None, verbose=False):
+	"""Build every group's table and write the database file"""
+	if groups is None:
+		groups = default_partition(width, height)
+	if address is None:
+		address = default_path(width, height)
+
+	tiles = sorted(tile for group in groups for tile in group)
+	assert tiles == list(range(1, width * height)), \
+			"Groups must cover every tile exactly once"
+
+	header = bytearray(MAGIC)
+	header.extend([VERSION, width, height, len(groups)])
+
+	for group in groups:
+		header.append(len(group))
+		header.extend(group)
+
+	directory = os.path.dirname(address)
+	if directory and not os.path.exists(directory):
+		os.makedirs(directory)
+
+	with open(address + '.tmp', 'wb') as f:
+		f.write(header)
+
+		for group in groups:
+			if verbose:
+				sys.stderr.write('group %s\n' % (group,))
+			f.write(build_table(width, height, group, verbose))
+
+	# Swap the finished file in so readers never map a partial database
+	if os.path.exists(address):
+		os.remove(address)
+	os.rename(address + '.tmp', address)
+	return address
+
+
+class PatternDatabase(object):
+	"""Additive pattern database heuristic backed by a memory-mapped file.
+
+	Has the same start/apply/revert/estimate interface as
+	solver.ManhattanConflict, so it can be handed straight to solver.search.
+	Only the group of the tile that slid is looked up again after a move.
+	"""
+
+	def __init__(self, address):
+		with open(address, 'rb') as f:
+			self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		header = bytearray(self._map[:8])
+		if bytes(header[:4]) != MAGIC or header[4] != VERSION:
+			raise ValueError('%s is not a pattern database' % address)
+
+		self.width, self.height = header[5], header[6]
+		cells = self.width * self.height
+		offset = 8
+		groups = []
+
+		for i in range(header[7]):
+			count = bytearray(self._map[offset:offset + 1])[0]
+			groups.append(tuple(bytearray(self._map[offset + 1:
+													offset + 1 + count])))
+			offset += 1 + count
+
+		self.groups = tuple(groups)
+		self.group_of = [None] * cells
+		self._offsets = []
+		self._weights = []
+		self._getters = []
+
+		for number, group in enumerate(self.groups):
+
+			for tile in group:
+				self.group_of[tile] = number
+			self._getters.append(itemgetter(*group) if len(group) > 1 else
+								 lambda where, tile=group[0]: (where[tile],))
+			self._offsets.append(offset)
+			self._weights.append(rank_weights(cells, len(group)))
+			offset += table_size(cells, len(group))
+
+		if offset != len(self._map):
+			raise ValueError('%s is truncated' % address)
+
+		if isinstance(self._map[0], int):
+			self._read = self._map.__getitem__
+		else:
+			# Python 2 mmaps index as one-character strings
+			self._read = lambda index: ord(self._map[index])
+
+		self._where = [0] * cells
+		self._values = [0] * len(self.groups)
+		self._undo = []
+
+	def close(self):
+		self._map.close()
+
+	def lookup(self, number, where):
+		"""Table value for a group given each tile's cell"""
+		positions = self._getters[number](where)
+		return self._read(self._offsets[number] +
+						  rank(positions, self._weights[number]))
+
+	def estimate(self, tiles):
+		"""Full (non-incremental) estimate for a row-major position"""
+		where = [0] * len(tiles)
+
+		for pos, tile in enumerate(tiles):
+			where[tile] = pos
+
+		return sum(self.lookup(number, where)
+				   for number in range(len(self.groups)))
+
+	def start(self, tiles):
+		"""Prime the incremental state for tiles and return its estimate"""
+		for pos, tile in enumerate(tiles):
+			self._where[tile] = pos
+
+		self._values = [self.lookup(number, self._where)
+						for number in range(len(self.groups))]
+		del self._undo[:]
+		return sum(self._values)
+
+	def apply(self, tiles, tile, src, dst):
+		"""Return the estimate change after tile slid from src to dst"""
+		number = self.group_of[tile]
+		self._where[tile] = dst
+		old = self._values[number]
+		new = self.lookup(number, self._where)
+		self._values[number] = new
+		self._undo.append((number, old, tile, src))
+		return new - old
+
+	def revert(self):
+		"""Undo the most recent apply()"""
+		number, old, tile, src = self._undo.pop()
+		self._values[number] = old
+		self._where[tile] = src
+
+
+def load(width, height):
+	"""Open the default database for a board size, or None if not built"""
+	address = default_path(width, height)
+	if not os.path.exists(address):
+		return None
+	return PatternDatabase(address)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Build a pattern database')
+	parser.add_argument('width', type=int, nargs='?', default=4)
+	parser.add_argument('height', type=int, nargs='?', default=4)
+	parser.add_argument('-o', '--output', help='file to write')
+	parser.add_argument('-g', '--groups',
+						help='tile groups, e.g. 1,2,3,4,5/6,7,8,9,10/...')
+	args = parser.parse_args()
+
+	groups = None
+	if args.groups:
+		groups = tuple(tuple(int(tile) for tile in group.split(','))
+					   for group in args.groups.split('/'))
+
+	started = time.time()
+	address = build(args.width, args.height, groups, args.output, True)
+	sys.stderr.write('wrote %s in %.1fs\n' % (address, time.time() - started))
+
+
+if __name__ == '__main__':
+	main()
@@ -4,9 +4,23 @@
 
 	Program will take a picture and slice it into equal squares for use
 	in slide puzzle game
+
+	Usage: python picture_slicer.py [picture [save_address]]
+		   python picture_slicer.py folder [-j 4] [--rows 4 --cols 4]
+
+	Given a folder, every picture under it gets its own album, made across
+	a pool of worker processes. Pictures whose album is newer than the
+	picture and made with the same settings (kept in <name>-new-album.json)
+	are skipped unless --force is given. --memory reads each
+	picture a strip at a time to cap memory use on very big pictures.
+
+	With --format atlas the album is a single <name>-new-album.atlas file
+	instead: a 16 byte header (ATLASHEADER) giving the grid and tile size,
+	then the raw RGB or RGBA pixels of the whole resized picture, ready to
+	be memory-mapped.
 """
 from PIL import Image
-import os, sys
+import argparse, json, multiprocessing, os, struct, sys, time
 
 dirpath = os.path.abspath(os.path.dirname(__file__))
 
@@ -16,6 +30,16 @@ rows = 4
 cols = 4
 size = (400, 400)
 
+EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif') # Found in batch mode
+
+ATLASMAGIC = b'SPTA'
+ATLASVERSION = 1
+# magic, version, rows, cols, tile width, tile height, bytes per pixel
+ATLASHEADER = '<4sHHHHHBx'
+ATLASMODES = {3: 'RGB', 4: 'RGBA'}
+
+STRIPBYTES = 32 * 1024 * 1024 # Source pixels prepare_picture_strips holds
+
 
 def get_picture(address):
 	"""Uploads picture of user's choice"""
@@ -56,64 +80,377 @@ def crop_picture(picture, size):
 	return picture
 
 
+def prepare_picture(address, size):
+	"""Opens a picture already resized and cropped to size.
+
+	Frames the picture the same way as resize_picture then crop_picture,
+	but JPEGs are decoded at a reduced scale when they are much bigger
+	than size, and only the part that survives the crop is resampled.
+	"""
+	picture = Image.open(address)
+	width, height = picture.size
+	scale = max(float(size[0]) / width, float(size[1]) / height)
+
+	# Decode at 1/2, 1/4 or 1/8 scale when that still covers size
+	picture.draft('RGB', (int(width * scale + 1), int(height * scale + 1)))
+	if picture.mode not in ('RGB', 'RGBA'):
+		picture = picture.convert('RGB')
+
+	width, height = picture.size
+	scale = max(float(size[0]) / width, float(size[1]) / height)
+	# Rounding can leave the crop a hair bigger than the picture
+	crop_width = min(width, size[0] / scale)
+	crop_height = min(height, size[1] / scale)
+	crop_box = ((width - crop_width) / 2,
+				(height - crop_height) / 2,
+				(width + crop_width) / 2,
+				(height + crop_height) / 2)
+
+	return picture.resize(size, Image.BICUBIC, box=crop_box)
+
+
+def _get_row_layout(picture):
+	"""(offset, raw mode, stride, orientation) of a picture stored as plain
+	rows, so any run of rows can be read on its own; None otherwise"""
+	if len(picture.tile) != 1:
+		return None
+
+	codec, extents, offset, args = picture.tile[0]
+	if codec != 'raw' or tuple(extents) != (0, 0) + picture.size:
+		return None
+
+	if not isinstance(args, tuple):
+		args = (args,)
+	raw_mode = args[0]
+	stride = args[1] if len(args) > 1 else 0
+	orientation = args[2] if len(args) > 2 else 1
+
+	if not stride:
+		try:
+			stride = len(Image.new(raw_mode, (picture.size[0], 1)).tobytes())
+		except ValueError:
+			return None # Packed format we can't measure
+	return offset, raw_mode, stride, orientation
+
+
+def _read_rows(address, layout, top, bottom):
+	"""Decode rows top to bottom of a picture laid out as plain rows"""
+	picture = Image.open(address)
+	width, height = picture.size
+	offset, raw_mode, stride, orientation = layout
+
+	if orientation < 0:
+		# Stored bottom row first
+		offset += (height - bottom) * stride
+	else:
+		offset += top * stride
+
+	if hasattr(picture, '_size'):
+		picture._size = (width, bottom - top)
+	else:
+		picture.size = (width, bottom - top)
+	if hasattr(picture, '_tile_size'):
+		picture._tile_size = (width, bottom - top) # TIFF allocates by this
+	picture.tile = [('raw', (0, 0, width, bottom - top), offset,
+					 (raw_mode, stride, orientation))]
+	picture.load()
+	return picture
+
+
+def prepare_picture_strips(address, size, max_bytes=STRIPBYTES):
+	"""Same as prepare_picture, holding only about max_bytes of the source.
+
+	The source is read a strip of rows at a time and each strip is
+	resampled into its share of the output rows. Strips overlap by the
+	resampling filter's reach, so the result matches resampling the whole
+	picture at once. Only pictures stored as plain rows (BMP, PPM,
+	uncompressed TIFF and the like) can be read in strips; anything else,
+	JPEG and PNG included, goes through prepare_picture, where JPEG draft
+	mode already keeps memory down.
+	"""
+	picture = Image.open(address)
+	layout = _get_row_layout(picture)
+	if layout is None or picture.mode not in ('RGB', 'RGBA'):
+		return prepare_picture(address, size)
+
+	width, height = picture.size
+	scale = max(float(size[0]) / width, float(size[1]) / height)
+	crop_width = min(width, size[0] / scale)
+	crop_height = min(height, size[1] / scale)
+	left = (width - crop_width) / 2
+	top = (height - crop_height) / 2
+
+	# Source rows the bicubic filter reaches past each end of a strip
+	margin = int(2 * max(1, 1 / scale)) + 2
+	# Decoded pixels take 4 bytes whatever the mode
+	strip_rows = max(1, max_bytes // (width * 4) - 2 * margin)
+	band = max(1, int(strip_rows * scale))
+	prepared = Image.new(picture.mode, size)
+
+	for first in range(0, size[1], band):
+		last = min(size[1], first + band)
+		band_top = top + first / scale
+		band_bottom = top + last / scale
+		strip_top = max(0, int(band_top) - margin)
+		strip_bottom = min(height, int(band_bottom) + 1 + margin)
+
+		strip = _read_rows(address, layout, strip_top, strip_bottom)
+		rows = strip.resize((size[0], last - first), Image.BICUBIC,
+							box=(left, band_top - strip_top,
+								 left + crop_width, band_bottom - strip_top))
+		prepared.paste(rows, (0, first))
+
+	return prepared
+
+
 def save_picture(picture, address=None):
 	"""Gets a save address and saves the image"""
 	if not address:
 		# Ask for an address
-		print "No address"
+		print("No address")
 
 	picture.save(address)
 
 
 def main(image_address=default_address, image_save_address=None):
-	if len(sys.argv) > 1:
-		image_address = sys.argv[1]
-
-	if len(sys.argv) > 2:
-		image_save_address = sys.argv[2]
-	else:
-		if not image_save_address:
-			image_save_address = image_address.split('.')
-			image_save_address[-2] += '-new'
-			image_save_address = '.'.join(image_save_address)
+	parser = argparse.ArgumentParser(
+		description='Slice pictures into albums of puzzle tiles')
+	parser.add_argument('picture', nargs='?', default=image_address,
+						help='picture to slice, or a folder of pictures')
+	parser.add_argument('save_address', nargs='?', default=image_save_address,
+						help='where to save the resized picture')
+	parser.add_argument('--rows', type=int, default=rows)
+	parser.add_argument('--cols', type=int, default=cols)
+	parser.add_argument('--size', type=int, nargs=2, default=size,
+						metavar=('WIDTH', 'HEIGHT'))
+	parser.add_argument('--format', default='jpg',
+						choices=('jpg', 'png', 'atlas'),
+						help='file type of the tiles')
+	parser.add_argument('--quality', type=int,
+						help='JPEG quality of the tiles')
+	parser.add_argument('-j', '--workers', type=int,
+						help='worker processes for a folder (default one per '
+							 'core)')
+	parser.add_argument('--force', action='store_true',
+						help='remake albums that are already up to date')
+	parser.add_argument('--memory', type=int, metavar='MB',
+						help='read pictures in strips, holding about this '
+							 'much of each at once')
+	args = parser.parse_args()
+	args.size = tuple(args.size)
+
+	if os.path.isdir(args.picture):
+		started = time.time()
+		made, skipped, read = make_albums(args.picture, args.rows, args.cols,
+										  args.size, args.format,
+										  args.quality, args.workers,
+										  args.force, args.memory)
+		seconds = max(time.time() - started, 1e-6)
+		sys.stderr.write('made %d albums in %.1fs (%.1f pictures/s, '
+						 '%.1f MB/s), %d already up to date\n'
+						 % (made, seconds, made / seconds,
+							read / seconds / 1e6, skipped))
+		return
+
+	image_address = args.picture
+	image_save_address = args.save_address
+	if not image_save_address:
+		image_save_address = image_address.split('.')
+		image_save_address[-2] += '-new'
+		image_save_address = '.'.join(image_save_address)
 	
 
-	picture = get_picture(image_address)
-	picture = resize_picture(picture, size)
-	picture = crop_picture(picture, size)
-	save_picture(picture, image_save_address)
-
-
 	address = image_save_address.split('/')
 	address[-1] = '/' + address[-1].split('.')[0] + '-album'
 	address = dirpath + '/'.join(address)
 
-	pictures = slice_picture(picture, rows, cols)
-	save_sliced_picture(pictures, rows, cols, address) 
+	picture = load_prepared(image_address, args.size, args.memory)
+	save_picture(picture, image_save_address)
+
+
+	if args.format == 'atlas':
+		save_atlas(picture, args.rows, args.cols, address + '.atlas')
+		return
+
+	pictures = slice_picture(picture, args.rows, args.cols, args.size)
+	save_sliced_picture(pictures, args.rows, args.cols, address,
+						args.format, args.quality)
+
+
+def load_prepared(image_address, size, memory=None):
+	"""prepare_picture, or prepare_picture_strips within memory MB"""
+	if memory:
+		return prepare_picture_strips(image_address, size, memory << 20)
+	return prepare_picture(image_address, size)
+
+
+def get_album_addresses(image_address):
+	"""Where the resized picture and the album for a picture are saved"""
+	stem, extension = os.path.splitext(image_address)
+	return stem + '-new' + extension, stem + '-new-album'
+
+
+def find_pictures(folder):
+	"""Pictures under folder, leaving out the slicer's own output.
+
+	Output is only recognised next to the picture it was made from, as
+	named by get_album_addresses, so a folder that merely ends in -album
+	is still searched.
+	"""
+	for root, dirs, files in os.walk(folder):
+		pictures = [name for name in files
+					if os.path.splitext(name)[1].lower() in EXTENSIONS]
+		made = set()
+
+		for name in pictures:
+			save_address, album_address = get_album_addresses(name)
+			made.add(save_address)
+			made.add(album_address)
+
+		dirs[:] = sorted(name for name in dirs if name not in made)
+
+		for name in sorted(pictures):
+			if name not in made:
+				yield os.path.join(root, name)
+
+
+def get_stamp(rows, cols, size, extension, quality):
+	"""The settings an album was made with, as saved next to it"""
+	return {'rows': rows, 'cols': cols, 'size': list(size),
+			'format': extension, 'quality': quality}
+
+
+def get_tile_names(rows, cols, extension):
+	return ['%d.%s' % (tile + 1, extension) for tile in range(rows * cols)]
+
+
+def get_stale_tiles(album_address, names):
+	"""Tiles in an album folder that aren't among names, left by an
+	earlier grid or format"""
+	if not os.path.isdir(album_address):
+		return []
+	return [os.path.join(album_address, name)
+			for name in os.listdir(album_address)
+			if os.path.splitext(name)[0].isdigit() and name not in names]
+
+
+def is_up_to_date(image_address, rows, cols, size=size, extension='jpg',
+				  quality=None):
+	"""Whether a picture's album was made with these settings and every
+	output is newer than the picture"""
+	save_address, album_address = get_album_addresses(image_address)
+	try:
+		with open(album_address + '.json') as stamp_file:
+			stamp = json.load(stamp_file)
+	except (IOError, OSError, ValueError):
+		return False
+	if stamp != get_stamp(rows, cols, size, extension, quality):
+		return False
+
+	if extension == 'atlas':
+		outputs = [save_address, album_address + '.atlas']
+	else:
+		names = get_tile_names(rows, cols, extension)
+		if get_stale_tiles(album_address, names):
+			return False
+		outputs = [save_address] + [os.path.join(album_address, name)
+									for name in names]
+	changed = os.path.getmtime(image_address)
+
+	for output in outputs:
+		if not os.path.exists(output) or os.path.getmtime(output) < changed:
+			return False
+	return True
+
+
+def make_album(task):
+	"""Worker: resize, slice and save one picture; returns its file size"""
+	image_address, rows, cols, size, extension, quality, memory = task
+	save_address, album_address = get_album_addresses(image_address)
+
+	if extension != 'atlas':
+		for address in get_stale_tiles(album_address,
+									   get_tile_names(rows, cols, extension)):
+			os.remove(address)
+
+	picture = load_prepared(image_address, size, memory)
+	if extension == 'jpg' and picture.mode != 'RGB':
+		picture = picture.convert('RGB')
+	save_picture(picture, save_address)
+
+	if extension == 'atlas':
+		save_atlas(picture, rows, cols, album_address + '.atlas')
+	else:
+		save_sliced_picture(slice_picture(picture, rows, cols, size),
+							rows, cols, album_address, extension, quality)
+
+	# Written last, so an album cut short is made again next time
+	with open(album_address + '.json', 'w') as stamp_file:
+		json.dump(get_stamp(rows, cols, size, extension, quality), stamp_file)
+	return os.path.getsize(image_address)
+
+
+def make_albums(folder, rows=rows, cols=cols, size=size, extension='jpg',
+				quality=None, workers=None, force=False, memory=None):
+	"""Make an album for every picture under folder on a process pool.
+
+	Returns (albums made, pictures skipped as up to date, bytes read).
+	"""
+	tasks = []
+	skipped = 0
+
+	for image_address in find_pictures(folder):
+		if not force and is_up_to_date(image_address, rows, cols, size,
+									   extension, quality):
+			skipped += 1
+		else:
+			tasks.append((image_address, rows, cols, size, extension,
+						  quality, memory))
+
+	if not tasks:
+		return 0, skipped, 0
+
+	pool = multiprocessing.Pool(workers)
+	read = 0
+
+	try:
+		for file_size in pool.imap_unordered(make_album, tasks):
+			read += file_size
+		pool.close()
+	except BaseException:
+		pool.terminate()
+		raise
+	finally:
+		pool.join()
+
+	return len(tasks), skipped, read
 
 
 def slice_picture(picture, rows, cols, size=size):
 	"""Splits picture into a given number of rows and columns"""
 
 	pictures = []
+	tile_width = size[0] // cols
+	tile_height = size[1] // rows
 
-	for col in range(cols):
+	for row in range(rows):
 
-		for row in range(rows):
-			box = ((size[0]/cols)*row,
-				   (size[1]/rows)*col,
-				   ((size[0]/cols)*row) + (size[0]/cols),
-				   ((size[1]/rows)*col) + (size[1]/rows))
+		for col in range(cols):
+			box = (tile_width*col,
+				   tile_height*row,
+				   (tile_width*col) + tile_width,
+				   (tile_height*row) + tile_height)
 			pictures.append(picture.crop(box))
 
 	return pictures
 
 
-def save_sliced_picture(pictures, rows, cols, address=None):
+def save_sliced_picture(pictures, rows, cols, address=None, extension='jpg',
+						quality=None):
 	"""Saves split picture in an album"""
 	if not address:
 		# Ask for address
-		print "No address"
+		print("No address")
 
 	if not os.path.exists(address):
 		os.makedirs(address)
@@ -121,7 +458,41 @@ def save_sliced_picture(pictures, rows, cols, address=None):
 	for img in range(rows * cols):
 		imadd = address + '/' + str(img+1)
 		#import pdb; pdb.set_trace()
-		pictures[img].save(imadd + '.jpg')
+		if quality is None:
+			pictures[img].save(imadd + '.' + extension)
+		else:
+			pictures[img].save(imadd + '.' + extension, quality=quality)
+
+
+def save_atlas(picture, rows, cols, address):
+	"""Saves the whole grid of tiles as one raw-pixel atlas file"""
+	if picture.mode not in ('RGB', 'RGBA'):
+		picture = picture.convert('RGB')
+
+	tile_width = picture.size[0] // cols
+	tile_height = picture.size[1] // rows
+	picture = picture.crop((0, 0, tile_width * cols, tile_height * rows))
+	header = struct.pack(ATLASHEADER, ATLASMAGIC, ATLASVERSION, rows, cols,
+						 tile_width, tile_height, len(picture.mode))
+
+	with open(address, 'wb') as atlas_file:
+		atlas_file.write(header)
+		atlas_file.write(picture.tobytes())
+
+
+def read_atlas_header(data):
+	"""Returns (rows, cols, tile_width, tile_height, mode, pixel offset)
+	from the start of an atlas file's contents"""
+	size = struct.calcsize(ATLASHEADER)
+	magic, version, rows, cols, tile_width, tile_height, depth = \
+			struct.unpack(ATLASHEADER, data[:size])
+	if magic != ATLASMAGIC or version != ATLASVERSION or \
+	   depth not in ATLASMODES:
+		raise ValueError('Not a tile atlas')
+	if len(data) < size + rows * cols * tile_width * tile_height * depth:
+		raise ValueError('Tile atlas is cut short')
+
+	return rows, cols, tile_width, tile_height, ATLASMODES[depth], size
 
 
 if __name__ == '__main__':
@@ -0,0 +1,297 @@
+""" Real-time Solver
+
+	A fast, suboptimal solver for boards too big to solve optimally. It
+	works the way people do: finish the top row, then the left column, and
+	keep peeling rows and columns off until a 3x3 corner is left, which is
+	solved optimally with solver.py. Each tile (or the last two tiles of a
+	row or column, which have to go in together) is brought home with a
+	small weighted A* search that only moves tiles that are not finished.
+
+	Once there is a solution, whatever is left of the time budget is spent
+	making it shorter: loops that come back to the same board are cut, and
+	short stretches of the path are replaced by shorter routes between the
+	same two boards.
+
+	The budget only limits that improvement. The first solution always
+	takes as long as it takes: tens of milliseconds on 6x6, a few hundred
+	on 10x10. Callers that have to answer within a frame should solve in
+	the background and play the moves as they are reported, as
+	background_solve.py does.
+"""
+import heapq, time
+
+import solver
+from move_history import simplify
+from solver import UP, DOWN, LEFT, RIGHT
+
+WEIGHT = 3 # How greedily the placement searches chase their goal
+WINDOW = 12 # Length of path stretches the improver tries to shorten
+MAXWINDOW = 24
+
+
+def get_move(blank, new_blank, width):
+	"""Name of the move that sends the blank from blank to new_blank"""
+	if new_blank == blank + width:
+		return UP
+	elif new_blank == blank - width:
+		return DOWN
+	elif new_blank == blank + 1:
+		return LEFT
+	return RIGHT
+
+
+class _Builder(object):
+	"""A board being solved, with the moves made on it so far"""
+
+	def __init__(self, tiles, width, height, report=None):
+		self.tiles = list(tiles)
+		self.width = width
+		self.height = height
+		self.blank = self.tiles.index(0)
+		self.neighbours = solver.get_neighbours(width, height)
+		self.fixed = set()
+		self.moves = []
+		self.report = report
+
+	def play(self, blank_path):
+		"""Walk the blank through a list of neighbouring cells"""
+		tiles = self.tiles
+		first = len(self.moves)
+
+		for cell in blank_path:
+			self.moves.append(get_move(self.blank, cell, self.width))
+			tiles[self.blank], tiles[cell] = tiles[cell], 0
+			self.blank = cell
+
+		if self.report is not None and blank_path:
+			self.report(self.moves[first:])
+
+	def place(self, targets):
+		"""Bring each tile home to its target cell, then lock those cells.
+
+		targets maps goal cells to the tiles that belong there. Searches on
+		(cells of those tiles, blank cell); the other unlocked tiles are
+		free to be pushed around.
+		"""
+		width = self.width
+		goal = tuple(sorted(targets))
+		order = [targets[cell] for cell in goal]
+		start = tuple(self.tiles.index(tile) for tile in order) + (self.blank,)
+
+		def estimate(state):
+			total = 0
+			far = None
+
+			for pos, target in zip(state, goal):
+				distance = abs(pos % width - target % width) + \
+						   abs(pos // width - target // width)
+				total += distance
+				if distance:
+					reach = abs(pos % width - state[-1] % width) + \
+							abs(pos // width - state[-1] // width)
+					if far is None or reach < far:
+						far = reach
+
+			# A tile can't move until the blank gets next to it
+			return total + (far - 1 if far else 0)
+
+		heap = [(WEIGHT * estimate(start), 0, start)]
+		came_from = {start: None}
+		cost = {start: 0}
+
+		while heap:
+			f, g, state = heapq.heappop(heap)
+			if state[:-1] == goal:
+				break
+			if g > cost[state]:
+				continue
+
+			blank = state[-1]
+
+			for cell, move in self.neighbours[blank]:
+				if cell in self.fixed:
+					continue
+
+				# Whichever tracked tile sat on cell slides into the blank
+				following = tuple(blank if pos == cell else pos
+								  for pos in state[:-1]) + (cell,)
+				if following not in cost or g + 1 < cost[following]:
+					cost[following] = g + 1
+					came_from[following] = state
+					heapq.heappush(heap, (g + 1 + WEIGHT * estimate(following),
+										  g + 1, following))
+		else:
+			raise ValueError('Tiles %s cannot be placed' % (order,))
+
+		blank_path = []
+		while came_from[state] is not None:
+			blank_path.append(state[-1])
+			state = came_from[state]
+
+		self.play(blank_path[::-1])
+		self.fixed.update(goal)
+
+	def solve_row(self, top, left):
+		"""Finish row top from column left to the right edge"""
+		width = self.width
+		cells = [top * width + x for x in range(left, width)]
+
+		for cell in cells[:-2]:
+			self.place({cell: cell + 1})
+		self.place({cells[-2]: cells[-2] + 1, cells[-1]: cells[-1] + 1})
+
+	def solve_column(self, top, left):
+		"""Finish column left from row top to the bottom edge"""
+		width = self.width
+		cells = [y * width + left for y in range(top, self.height)]
+
+		for cell in cells[:-2]:
+			self.place({cell: cell + 1})
+		self.place({cells[-2]: cells[-2] + 1, cells[-1]: cells[-1] + 1})
+
+	def solve_corner(self, top, left):
+		"""Solve the unlocked bottom-right corner optimally"""
+		width = self.width
+		corner_width = width - left
+		corner_height = self.height - top
+		cells = [y * width + x for y in range(top, self.height)
+				 for x in range(left, width)]
+
+		# Number the corner's tiles as if it were a board of its own
+		labels = dict((cell + 1, index + 1) for index, cell in enumerate(cells))
+		labels[0] = 0
+		corner = tuple(labels[self.tiles[cell]] for cell in cells)
+		moves, nodes = solver.search(corner, corner_width, corner_height,
+									 solver.ManhattanConflict(corner_width,
+															  corner_height))
+
+		offsets = {UP: width, DOWN: -width, LEFT: 1, RIGHT: -1}
+		blank_path = []
+		blank = self.blank
+
+		for move in moves:
+			blank += offsets[move]
+			blank_path.append(blank)
+		self.play(blank_path)
+
+	def solve(self):
+		top, left = 0, 0
+
+		while (self.width - left) * (self.height - top) > 9:
+			if self.height - top >= self.width - left:
+				self.solve_row(top, left)
+				top += 1
+			else:
+				self.solve_column(top, left)
+				left += 1
+
+		self.solve_corner(top, left)
+		return self.moves
+
+
+def _shortcut(start, end, width, height, limit):
+	"""Shortest route from start to end if it takes fewer than limit moves.
+
+	Meet-in-the-middle breadth first search; returns None if there is none.
+	"""
+	neighbours = solver.get_neighbours(width, height)
+	back = {UP: DOWN, DOWN: UP, LEFT: RIGHT, RIGHT: LEFT}
+	sides = [{start: []}, {end: []}]
+	frontiers = [[start], [end]]
+	depth = 0
+
+	while depth < limit - 1:
+		side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+		paths, other = sides[side], sides[1 - side]
+		following = []
+
+		for state in frontiers[side]:
+			blank = state.index(0)
+
+			for cell, move in neighbours[blank]:
+				tiles = list(state)
+				tiles[blank], tiles[cell] = tiles[cell], 0
+				tiles = tuple(tiles)
+				if tiles in paths:
+					continue
+
+				paths[tiles] = paths[state] + [move]
+				if tiles in other:
+					if side == 0:
+						route = paths[tiles] + \
+								[back[step] for step in reversed(other[tiles])]
+					else:
+						route = other[tiles] + \
+								[back[step] for step in reversed(paths[tiles])]
+					return route if len(route) < limit else None
+				following.append(tiles)
+
+		frontiers[side] = following
+		depth += 1
+
+	return None
+
+
+def improve(tiles, width, height, moves, deadline):
+	"""Shorten moves until time runs out or no stretch can be shortened.
+
+	Stretches start WINDOW moves long and grow each time a full pass over
+	the path finds nothing, up to MAXWINDOW.
+	"""
+	window = WINDOW
+
+	while window <= MAXWINDOW and time.time() < deadline:
+		moves = simplify(tiles, width, height, moves)
+		states = [tuple(tiles)]
+
+		for move in moves:
+			states.append(solver.apply_moves(states[-1], width, [move]))
+
+		improved = False
+		start = 0
+
+		while start + window <= len(moves) and time.time() < deadline:
+			route = _shortcut(states[start], states[start + window],
+							  width, height, window)
+			if route is not None:
+				route_states = [states[start]]
+
+				for move in route:
+					route_states.append(solver.apply_moves(route_states[-1],
+														   width, [move]))
+				moves[start:start + window] = route
+				states[start:start + window + 1] = route_states
+				improved = True
+			start += window // 2
+
+		if not improved:
+			window += WINDOW // 2
+
+	return simplify(tiles, width, height, moves)
+
+
+def search(tiles, width, height, budget=None, report=None):
+	"""Moves solving a row-major board, improved until budget ms have
+	passed since the call. The budget is not a cap: the first solution is
+	always finished, however long it takes.
+
+	If report is given it is called with each batch of moves as soon as
+	that part of the board is finished, so they can be played before the
+	whole solve is done. Those moves are final, so nothing is improved.
+	"""
+	started = time.time()
+	if not solver.is_solvable(tiles, width, height):
+		raise ValueError('Board is not solvable')
+
+	moves = _Builder(tiles, width, height, report).solve()
+	if budget and report is None:
+		moves = improve(tiles, width, height, moves, started + budget / 1000.0)
+	return moves
+
+
+def solve(board, budget=None):
+	"""Moves that solve a board of columns, improved until budget ms have
+	passed (see search)"""
+	width = len(board)
+	height = len(board[0])
+	return search(solver.board_to_tiles(board), width, height, budget)
@@ -0,0 +1,54 @@
+""" Scrambler
+
+	Deals out slide puzzle boards drawn uniformly from every solvable
+	position, instead of walking random slides away from the solved board.
+	Boards are row-major tuples with 0 for the blank, as in solver.py.
+"""
+import random
+
+import solver
+
+
+def random_tiles(width, height, rng=random):
+	"""A uniformly random solvable board.
+
+	Half of all shuffles can't be solved. Swapping the first two tiles
+	flips the parity and pairs every unsolvable shuffle with exactly one
+	solvable one, so fixing instead of redrawing stays uniform.
+	"""
+	tiles = list(range(1, width * height)) + [0]
+	rng.shuffle(tiles)
+
+	if not solver.is_solvable(tiles, width, height):
+		first, second = [pos for pos, tile in enumerate(tiles) if tile][:2]
+		tiles[first], tiles[second] = tiles[second], tiles[first]
+
+	return tuple(tiles)
+
+
+def scramble(width, height, min_distance=0, rng=random, attempts=1000):
+	"""A uniformly random solvable board needing at least min_distance moves.
+
+	Boards whose heuristic estimate already reaches min_distance are taken
+	straight away. The rest are only searched to depth min_distance - 1,
+	which is enough to tell whether they are too close to solved.
+	"""
+	heuristic = None
+
+	for i in range(attempts):
+		tiles = random_tiles(width, height, rng)
+		if not min_distance:
+			return tiles
+
+		if heuristic is None:
+			heuristic = solver.get_heuristic(width, height)
+		if heuristic.estimate(tiles) >= min_distance:
+			return tiles
+
+		moves, nodes = solver.search(tiles, width, height, heuristic,
+									 max_moves=min_distance - 1)
+		if moves is None:
+			return tiles
+
+	raise ValueError('No board %d moves from solved found in %d attempts'
+					 % (min_distance, attempts))
@@ -6,10 +6,24 @@
 """
 
 
-import pygame, os, sys, random
+import pygame, mmap, os, sys
 from pygame.locals import *
 
+# Helpers shared with the other games live in gamelib, next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from gamelib import layout, text_cache
+
+import animation
+import background_image
+import background_solve
+import engine
+import hints
+import move_history
+import packed_board
 import picture_slicer
+import scrambler
+from engine import UP, DOWN, LEFT, RIGHT, OPPOSITE, get_blank_position, \
+				   make_move, is_valid_move
 
 dirpath = os.path.abspath(os.path.dirname(__file__))
 
@@ -22,6 +36,10 @@ WINDOWWIDTH = 800
 WINDOWHEIGHT = 600
 FPS = 30
 BLANK = None
+SCRAMBLEDISTANCE = 30 # Fewest moves a new puzzle can be solved in
+SOLVESLIDETIME = 70 # Milliseconds per slide when playing back a solve
+PLAYBACKTIME = 2000 # Longest a Reset or finished Solve takes to play
+FASTSLIDETIME = 2 * 1000 // FPS # Quickest slide a playback will show
 
 # Colors (R, G, B)
 BLACK = (0, 0, 0)
@@ -40,27 +58,44 @@ BUTTONCOLOR = WHITE
 BUTTONTEXTCOLOR = BLACK
 MESSAGECOLOR = WHITE
 
+TILESHEET = None # Picture on the tiles; they show numbers until it loads
+SHOWN_MESSAGE = None # Message on screen now, and where it is
+MESSAGE_RECT = None
+
 XMARGIN = int((WINDOWWIDTH - (TILESIZE * BOARDWIDTH + (BOARDWIDTH - 1))) / 2)
 YMARGIN = int((WINDOWHEIGHT - (TILESIZE * BOARDHEIGHT + (BOARDHEIGHT - 1)))/2)
 
-UP = 'up'
-DOWN = 'down'
-LEFT = 'left'
-RIGHT = 'right'
+# Tiles sit one pixel apart
+TILES = layout.GridLayout(BOARDWIDTH, BOARDHEIGHT, TILESIZE, 1,
+						  XMARGIN - 1, YMARGIN - 1)
+
+# Where each tile's picture is on the tile sheet
+TILEAREAS = dict((i + 1, ((i % BOARDWIDTH) * TILESIZE,
+						  (i // BOARDWIDTH) * TILESIZE,
+						  TILESIZE, TILESIZE))
+				 for i in range(BOARDWIDTH * BOARDHEIGHT))
 
 
 def main():
 	global FPSCLOCK, DISPLAYSURF, BASICFONT, RESET_SURF, RESET_RECT, NEW_SURF, \
-		   NEW_RECT, SOLVE_SURF, SOLVE_RECT, IMAGES
+		   NEW_RECT, SOLVE_SURF, SOLVE_RECT, HINT_SURF, HINT_RECT, TILESHEET, \
+		   BACKGROUND
 
-	IMAGES = generate_image()
 	pygame.init()
 	FPSCLOCK = pygame.time.Clock()
 	DISPLAYSURF = pygame.display.set_mode((WINDOWWIDTH, WINDOWHEIGHT))
+	# Get the picture ready while the game starts with numbered tiles
+	image_job = background_image.ImageJob(get_image_address(), TILESIZE,
+										  BOARDWIDTH, BOARDHEIGHT)
 	pygame.display.set_caption('Slide Puzzle')
 	BASICFONT = pygame.font.Font('freesansbold.ttf', BASICFONTSIZE)
 
 	# Store the option buttons and their rectangles in OPTIONS
+	HINT_SURF, HINT_RECT = make_text('Hint',
+									 TEXTCOLOR,
+									 TILECOLOR,
+									 WINDOWWIDTH - 120,
+									 WINDOWHEIGHT - 120)
 	RESET_SURF, RESET_RECT = make_text('Reset',
 									   TEXTCOLOR,
 									   TILECOLOR,
@@ -77,25 +112,78 @@ def main():
 									   WINDOWWIDTH - 120,
 									   WINDOWHEIGHT - 30)
 
+	BACKGROUND = make_background()
+
 	SOLVEDBOARD = get_starting_board() #Same as the board in a start state
 	#import pdb; pdb.set_trace()
-	main_board, solution_sequence = generate_new_puzzle(80)
-	all_moves = [] # List of moves made from the solved configuration
+	main_board = generate_instant_puzzle(SCRAMBLEDISTANCE)
+	shown_board = copy_board(main_board) # Trails main_board while sliding
+	slides = animation.SlideScheduler() # Moves made but not yet shown
+	playback = None # Scheduler playing a Reset or finished Solve, if any
+	all_moves = move_history.MoveHistory.from_board(main_board) # Moves played
+	solve_job = None # Solve running in the background, if any
+	solve_moves = [] # Moves from solve_job still to be played
+	hint_engine = hints.HintEngine() # Remembers solves between hints
+	hint_job = None # Solve for a hint the table didn't have, if any
+	hint_board = None # The board hint_job is solving
+	hint_moves = [] # Moves from hint_job so far
+	redraw = True # Whether the whole window needs drawing again
 
 
 	while True: # Main game loop
-		slide_to = None
+		if image_job and image_job.done:
+			if image_job.error:
+				sys.stderr.write('Could not load picture: %s\n'
+								 % image_job.error)
+			else:
+				# Swap the picture in for the numbered tiles
+				TILESHEET = load_atlas(image_job.atlas_address)
+				redraw = True
+			image_job = None
+
 		message = "Click tile or press arrow keys to slide"
-		if main_board == SOLVEDBOARD:
+		if solve_job:
+			message = "Solving... click Solve again to stop"
+		elif hint_job:
+			message = "Finding a hint..."
+		elif main_board == SOLVEDBOARD and not slides and not playback:
 			message = "Solved!"
 
-		draw_board(main_board, message)
+		if redraw:
+			dirty = [draw_board(shown_board, message)]
+			redraw = False
+		else:
+			dirty = draw_message(message)
 
 		check_for_quit()
 
 		for event in pygame.event.get(): # Event handling loop
-
-			if event.type == MOUSEBUTTONUP:
+			slide_to = None
+			record = True # Whether slide_to is a new move for all_moves
+
+			if solve_job and event.type in (MOUSEBUTTONUP, KEYUP):
+				# Any click or key stops a solve that is still playing
+				solve_job.cancel()
+				solve_job = None
+				solve_moves = []
+				if event.type == MOUSEBUTTONUP and \
+				   SOLVE_RECT.collidepoint(event.pos):
+					continue # Clicking Solve again only stops it
+
+			if playback and event.type in (MOUSEBUTTONUP, KEYUP):
+				# Any click or key skips to the end of a playback
+				playback.clear()
+				playback = None
+				shown_board = copy_board(main_board)
+				redraw = True
+				if event.type == MOUSEBUTTONUP and \
+				   SOLVE_RECT.collidepoint(event.pos):
+					continue
+
+			if event.type == VIDEOEXPOSE:
+				redraw = True # Window was uncovered
+
+			elif event.type == MOUSEBUTTONUP:
 				spotx, spoty = get_spot_clicked(main_board, 
 												event.pos[0],
 												event.pos[1])
@@ -104,17 +192,34 @@ def main():
 					# Check if the user clicked on an option buttons
 					if RESET_RECT.collidepoint(event.pos):
 						# Clicked on reset button
-						reset_animation(main_board, all_moves)
-						all_moves = []
+						slides.clear()
+						shown_board, playback = reset_animation(
+							main_board, all_moves.simplified())
+						all_moves.clear()
+						redraw = True
 					elif NEW_RECT.collidepoint(event.pos):
 						# Clicked on New Game button
-						main_board, solution_sequence = generate_new_puzzle(80)
-						all_moves = []
+						if hint_job:
+							hint_job.cancel()
+							hint_job = None
+							hint_moves = []
+						main_board = generate_instant_puzzle(SCRAMBLEDISTANCE)
+						all_moves = move_history.MoveHistory.from_board(main_board)
+						slides.clear()
+						shown_board = copy_board(main_board)
+						redraw = True
 					elif SOLVE_RECT.collidepoint(event.pos):
 						# Clicked on Solve button
-						reset_animation(main_board, 
-										solution_sequence + all_moves)
-						all_moves = []
+						solve_job = background_solve.SolveJob(main_board)
+					elif HINT_RECT.collidepoint(event.pos) and \
+						 main_board != SOLVEDBOARD:
+						# Clicked on Hint button: play the best next move
+						slide_to = hint_engine.lookup(main_board)
+						if slide_to is None and not hint_job:
+							# A board not solved before; the move is played
+							# once the background solve finds it
+							hint_board = copy_board(main_board)
+							hint_job = background_solve.SolveJob(hint_board)
 
 				else:
 					# Check if the clicked tile was next to the blank spot
@@ -138,17 +243,64 @@ def main():
 					slide_to = UP
 				elif event.key in (K_DOWN, K_s) and is_valid_move(main_board, DOWN):
 					slide_to = DOWN
-
-		if slide_to:
-			# Show slide on screen
-			slide_animation(main_board, 
-							slide_to, 
-							message,
-							8)
-			make_move(main_board, slide_to)
-			draw_board(main_board, message)
-			all_moves.append(slide_to) # Record the slide
-		pygame.display.update()
+				elif event.key == K_z and len(all_moves):
+					# Undo by sliding the last move back
+					slide_to = OPPOSITE[all_moves.undo()]
+					record = False
+				elif event.key == K_y:
+					slide_to = all_moves.redo()
+					record = False
+
+			if slide_to:
+				# Make the move now and let the screen catch up
+				make_move(main_board, slide_to)
+				slides.push(slide_to)
+				if record:
+					all_moves.append(slide_to) # Record the slide
+
+		if solve_job:
+			# Play the solver's moves as they arrive
+			solve_moves.extend(solve_job.poll())
+			if solve_moves and solve_job.done:
+				# Everything is in, so fast-forward through what's left
+				slides.clear()
+				shown_board, playback = play_back(main_board, solve_moves)
+				all_moves.extend(solve_moves)
+				solve_moves = []
+				redraw = True
+			elif solve_moves:
+				if not slides:
+					move = solve_moves.pop(0)
+					make_move(main_board, move)
+					slides.push(move, SOLVESLIDETIME)
+					all_moves.append(move)
+			elif solve_job.done:
+				solve_job = None
+				if main_board == SOLVEDBOARD:
+					all_moves = move_history.MoveHistory.from_board(main_board)
+
+		if hint_job:
+			hint_moves.extend(hint_job.poll())
+			if hint_job.done:
+				if not hint_job.error:
+					hint_engine.remember(packed_board.from_columns(hint_board),
+										 hint_moves)
+					if hint_moves and main_board == hint_board and \
+					   not solve_job and not playback:
+						# Still on the board the hint was asked for
+						make_move(main_board, hint_moves[0])
+						slides.push(hint_moves[0])
+						all_moves.append(hint_moves[0])
+				hint_job = None
+				hint_moves = []
+
+		if playback:
+			dirty.extend(draw_slides(shown_board, playback))
+			if not playback:
+				playback = None
+		else:
+			dirty.extend(draw_slides(shown_board, slides))
+		pygame.display.update(dirty)
 		FPSCLOCK.tick(FPS)
 
 
@@ -171,138 +323,104 @@ def check_for_quit():
 
 def get_starting_board():
 	"""Return a solved board"""
-	counter = 1
-	board = []
-
-	for x in range(BOARDWIDTH):
-		column = []
-
-		for y in range(BOARDHEIGHT):
-			column.append(counter)
-			counter += BOARDWIDTH
-
-		board.append(column)
-		counter -= BOARDWIDTH * (BOARDHEIGHT - 1) + BOARDWIDTH - 1
+	return engine.get_starting_board(BOARDWIDTH, BOARDHEIGHT)
 
-	board[BOARDWIDTH - 1][BOARDHEIGHT - 1] = None
-	return board
 
-
-def get_blank_position(board):
-	"""Return the x and y coordinates of the blank space"""
-	for x in range(BOARDWIDTH):
-
-		for y in range(BOARDHEIGHT):
-
-			if board[x][y] == None:
-				return (x, y)
-
-
-def make_move(board, move):
-	"""Makes desired move after its validity has been checked"""
-	blankx, blanky = get_blank_position(board)
-
-	if move == UP:
-		board[blankx][blanky], board[blankx][blanky+1] = \
-		board[blankx][blanky+1], board[blankx][blanky]
-	elif move == DOWN:
-		board[blankx][blanky] = board[blankx][blanky-1]
-		board[blankx][blanky-1] = None
-	elif move == LEFT:
-		board[blankx][blanky] = board[blankx+1][blanky]
-		board[blankx+1][blanky] = None
-	elif move == RIGHT:
-		board[blankx][blanky] = board[blankx-1][blanky]
-		board[blankx-1][blanky] = None
-
-
-def is_valid_move(board, move):
-	#Checks to see if desired move is valid
-	blankx, blanky = get_blank_position(board)
-
-	if move == UP and blanky != len(board[0]) - 1:
-		return True
-	elif move == DOWN and blanky != 0:
-		return True
-	elif move == LEFT and blankx != len(board) - 1:
-		return True
-	elif move == RIGHT and blankx != 0:
-		return True
-	else:
-		return False
-
-
-def get_random_move(board, last_move = None):
-	#Picks a random move while checking for validity"
-	# Start with a full list of all four moves
-	possible_moves = [UP, DOWN, LEFT, RIGHT]
-
-	# Remove moves from the list as they are disqualified
-	if last_move == UP or not is_valid_move(board, DOWN):
-		possible_moves.remove(DOWN)
-	if last_move == DOWN or not is_valid_move(board, UP):
-		possible_moves.remove(UP)
-	if last_move == LEFT or not is_valid_move(board, RIGHT):
-		possible_moves.remove(RIGHT)
-	if last_move == RIGHT or not is_valid_move(board, LEFT):
-		possible_moves.remove(LEFT)
-
-	# Return a random move from the list of remaining moves
-	return random.choice(possible_moves)
+def copy_board(board):
+	"""A separate copy of a board"""
+	return packed_board.ColumnsView(packed_board.from_columns(board))
 
 
 def get_left_top_of_tile(tileX, tileY):
 	"""Takes our tile position and returns actual pixel position"""
-	left = XMARGIN + (tileX * TILESIZE) + (tileX - 1)
-	top = YMARGIN + (tileY * TILESIZE) + (tileY - 1)
-	return (left, top)
+	return TILES.left_top(tileX, tileY)
 
 
 
 
 
 def get_spot_clicked(board, x, y):
-	"""From x&y board coordinates, get the x&y pixel coordinates"""
-
-	for tile_x in range(len(board)):
-
-		for tile_y in range(len(board[0])):
-			left, top = get_left_top_of_tile(tile_x, tile_y)
-			tile_rect = pygame.Rect(left, top, TILESIZE, TILESIZE)
-
-			if tile_rect.collidepoint(x, y):
-				return (tile_x, tile_y)
-
-	return (None, None)
+	"""From x&y pixel coordinates, get the x&y board coordinates"""
+	return TILES.cell_at(x, y)
 
 
 def draw_tile(tile_x, tile_y, number, adjx=0, adjy=0):
 	"""Draw a tile at board coordinates tile_x and tile_y, with optional
 	adjustment using adjx and adjy"""
 	left, top = get_left_top_of_tile(tile_x, tile_y)
-	#pygame.draw.rect(DISPLAYSURF, 
-	#				 TILECOLOR, 
-	#				 (left + adjx, top + adjy, TILESIZE, TILESIZE))
-	#text_surf = BASICFONT.render(str(number), True, TEXTCOLOR)
-	#text_rect = text_surf.get_rect()
-	#text_rect.center = left + int(TILESIZE / 2) + adjx, \
-	#				   top + int(TILESIZE / 2) + adjy
-	DISPLAYSURF.blit(IMAGES[number], (left + adjx, top + adjy))
+	if TILESHEET is not None:
+		DISPLAYSURF.blit(TILESHEET, (left + adjx, top + adjy),
+						 TILEAREAS[number])
+		return
+
+	# No picture yet, so number the tile
+	pygame.draw.rect(DISPLAYSURF, 
+					 TILECOLOR, 
+					 (left + adjx, top + adjy, TILESIZE, TILESIZE))
+	text_surf = text_cache.render(BASICFONT, str(number), TEXTCOLOR)
+	text_rect = text_surf.get_rect()
+	text_rect.center = left + int(TILESIZE / 2) + adjx, \
+					   top + int(TILESIZE / 2) + adjy
+	DISPLAYSURF.blit(text_surf, text_rect)
 
 
 def make_text(text, color, bgcolor, top, left):
 	"""Create the Surface and Rect Objects for some text"""
-	text_surf = BASICFONT.render(text, True, color, bgcolor)
+	text_surf = text_cache.render(BASICFONT, text, color, bgcolor)
 	text_rect = text_surf.get_rect()
 	text_rect.topleft = (top, left)
 	return (text_surf, text_rect)
 
 
-def draw_board(board, message):
-	DISPLAYSURF.fill(BGCOLOR)
+def make_background():
+	"""Draw everything that never changes: the border and the buttons"""
+	background = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT)).convert()
+	background.fill(BGCOLOR)
+
+	left, top = get_left_top_of_tile(0, 0)
+	width = BOARDWIDTH * TILESIZE
+	height = BOARDHEIGHT * TILESIZE
+	pygame.draw.rect(background, 
+						BORDERCOLOR, 
+						(left - 5, top - 5, width + 11, height + 11), 
+						4)
+
+	background.blit(RESET_SURF, RESET_RECT)
+	background.blit(NEW_SURF, NEW_RECT)
+	background.blit(SOLVE_SURF, SOLVE_RECT)
+	background.blit(HINT_SURF, HINT_RECT)
+	return background
+
+
+def draw_message(message):
+	"""Show message in the top left corner, returning the rects that
+	changed (none if it is already showing)"""
+	global SHOWN_MESSAGE, MESSAGE_RECT
+	if message == SHOWN_MESSAGE:
+		return []
+
+	dirty = []
+	if MESSAGE_RECT:
+		# Wipe the old message back to the background
+		DISPLAYSURF.blit(BACKGROUND, MESSAGE_RECT, MESSAGE_RECT)
+		dirty.append(MESSAGE_RECT)
+		MESSAGE_RECT = None
+
 	if message:
-		text_surf, text_rect = make_text(message, MESSAGECOLOR, BGCOLOR, 5, 5)
-		DISPLAYSURF.blit(text_surf, text_rect)
+		text_surf, MESSAGE_RECT = make_text(message, MESSAGECOLOR, BGCOLOR, 5, 5)
+		DISPLAYSURF.blit(text_surf, MESSAGE_RECT)
+		dirty.append(MESSAGE_RECT)
+
+	SHOWN_MESSAGE = message
+	return dirty
+
+
+def draw_board(board, message):
+	"""Draw the whole window, returning its rect"""
+	global SHOWN_MESSAGE, MESSAGE_RECT
+	DISPLAYSURF.blit(BACKGROUND, (0, 0))
+	SHOWN_MESSAGE, MESSAGE_RECT = None, None
+	draw_message(message)
 
 	for tile_x in range(len(board)):
 
@@ -311,23 +429,13 @@ def draw_board(board, message):
 			if board[tile_x][tile_y]:
 				draw_tile(tile_x, tile_y, board[tile_x][tile_y])
 
-
-	left, top = get_left_top_of_tile(0, 0)
-	width = BOARDWIDTH * TILESIZE
-	height = BOARDHEIGHT * TILESIZE
-	pygame.draw.rect(DISPLAYSURF, 
-						BORDERCOLOR, 
-						(left - 5, top - 5, width + 11, height + 11), 
-						4)
-
-	DISPLAYSURF.blit(RESET_SURF, RESET_RECT)
-	DISPLAYSURF.blit(NEW_SURF, NEW_RECT)
-	DISPLAYSURF.blit(SOLVE_SURF, SOLVE_RECT)
+	return DISPLAYSURF.get_rect()
 
 
 
-def slide_animation(board, direction, message, animation_speed):
-	#creates the animation for each move""
+def draw_slide(board, direction, offset):
+	"""Draw the tile that direction slides, offset pixels along its way,
+	and return the rect that changed"""
 	blankx, blanky = get_blank_position(board)
 
 	if direction == UP:
@@ -343,111 +451,107 @@ def slide_animation(board, direction, message, animation_speed):
 		movex = blankx - 1
 		movey = blanky
 
-	# Prepare the base Surface
-	draw_board(board, message)
-	base_surf = DISPLAYSURF.copy()
+	number = board[movex][movey]
+	stepx, stepy = blankx - movex, blanky - movey
 
-	# Draw a blank space over the moving tile on the base_surf Surface
+	# Only the strip covering the tile's old and new spots changes
 	move_left, move_top = get_left_top_of_tile(movex, movey)
-	pygame.draw.rect(base_surf, 
-					 BGCOLOR, 
-					 (move_left, move_top, TILESIZE, TILESIZE))
+	blank_left, blank_top = get_left_top_of_tile(blankx, blanky)
+	strip = pygame.Rect(move_left, move_top, TILESIZE, TILESIZE).union(
+		pygame.Rect(blank_left, blank_top, TILESIZE, TILESIZE))
+
+	DISPLAYSURF.blit(BACKGROUND, strip, strip)
+	if offset >= TILESIZE:
+		# Land the tile exactly on the blank spot
+		draw_tile(blankx, blanky, number)
+	else:
+		draw_tile(movex, movey, number, stepx * offset, stepy * offset)
+	return strip
 
-	for i in range(0, TILESIZE + 1, animation_speed):
-		# Animate the tile sliding over
-		check_for_quit()
-		DISPLAYSURF.blit(base_surf, (0, 0))
-		if direction == UP:
-			draw_tile(movex, movey, board[movex][movey], 0, -i)
-		if direction == DOWN:
-			draw_tile(movex, movey, board[movex][movey], 0, i)
-		if direction == LEFT:
-			draw_tile(movex, movey, board[movex][movey], -i, 0)
-		if direction == RIGHT:
-			draw_tile(movex, movey, board[movex][movey], i, 0)
-
-		pygame.display.update()
-		FPSCLOCK.tick(FPS)
 
+def draw_slides(board, slides):
+	"""Bring the scheduled slides up to date on screen, making the moves
+	that finished on board (the board as shown); returns the dirty rects"""
+	dirty = []
 
+	for move in slides.advance(pygame.time.get_ticks()):
+		dirty.append(draw_slide(board, move, TILESIZE))
+		make_move(board, move)
 
-def generate_new_puzzle(num_slides):
-	"""Applies a number of random slides equal to num_slides"""
-	sequence = []
-	starting_board = get_starting_board()
-	draw_board(starting_board, "")
-	pygame.display.update()
-	pygame.time.wait(500) # Pause 500 milliseconds for effect
-	last_move = None
+	if slides.current:
+		dirty.append(draw_slide(board,
+								slides.current,
+								int(slides.progress * TILESIZE)))
+	return dirty
 
-	for i in range(num_slides):
-		move = get_random_move(starting_board, last_move)
-		slide_animation(starting_board, 
-						move, 
-						'Generating new puzzle...', 
-						animation_speed=int(TILESIZE/3))
-		make_move(starting_board, move)
-		sequence.append(move)
-		last_move = move
 
-	return (starting_board, sequence)
+def generate_instant_puzzle(min_distance=0):
+	"""Deals a random solvable board at once, without animating slides"""
+	tiles = scrambler.scramble(BOARDWIDTH, BOARDHEIGHT, min_distance)
+	return packed_board.ColumnsView(packed_board.from_tiles(tiles,
+															BOARDWIDTH,
+															BOARDHEIGHT))
 
 
 
+def play_back(board, moves, duration=PLAYBACKTIME):
+	"""Make moves on board, to be shown within duration milliseconds.
+
+	Moves that don't fit are shown at once, and only the last ones are
+	animated. Returns (shown board, scheduler) for the main loop to draw
+	with draw_slides, which it can stop at any time.
+	"""
+	skipped, slide_time = animation.plan_playback(len(moves),
+												  duration,
+												  SOLVESLIDETIME,
+												  FASTSLIDETIME)
+	for move in moves[:skipped]:
+		make_move(board, move)
+	shown_board = copy_board(board)
+
+	slides = animation.SlideScheduler(slide_time, duration)
+	for move in moves[skipped:]:
+		make_move(board, move)
+		slides.push(move)
+	return shown_board, slides
+
+
 def reset_animation(board, all_moves):
-	"""Make all of the moves in all_moves in reverse"""
+	"""Make all of the moves in all_moves in reverse, as play_back does"""
 	rev_all_moves = all_moves[:]
 	rev_all_moves = rev_all_moves[::-1]
+	return play_back(board, [OPPOSITE[move] for move in rev_all_moves])
 
-	for move in rev_all_moves:
-		if move == UP:
-			opposite_move = DOWN
-		elif move == DOWN:
-			opposite_move = UP
-		elif move == LEFT:
-			opposite_move = RIGHT
-		elif move == RIGHT:
-			opposite_move = LEFT
 
-		slide_animation(board, opposite_move, "", int(TILESIZE/2))
-		make_move(board, opposite_move)
-
-
-def generate_image(address='sample_pic.jpg'):
-	"""Creates a sliced image for use in the game"""
+def get_image_address(address='sample_pic.jpg'):
+	"""The picture to put on the tiles, from the command line if given"""
 	if len(sys.argv) > 1:
 		address = sys.argv[1]
-
-	img_ext = address.split('.')[-1]
-
-	base_image = picture_slicer.get_picture(address)
-	base_image = picture_slicer.resize_picture(base_image, 
-											   (TILESIZE * BOARDWIDTH, 
-											   	TILESIZE * BOARDHEIGHT)
-											   )
-	base_image = picture_slicer.crop_picture(base_image, 
-											 (TILESIZE * BOARDWIDTH, 
-											  TILESIZE * BOARDHEIGHT)
-											 )
-	images = picture_slicer.slice_picture(base_image, 
-										  BOARDWIDTH, 
-										  BOARDHEIGHT,
-										  (TILESIZE*BOARDWIDTH, 
-										   TILESIZE*BOARDHEIGHT)
-										  )
-
-	picture_slicer.save_sliced_picture(images, 
-									   BOARDWIDTH, 
-									   BOARDHEIGHT, 
-									   dirpath + '/temp')
-	images_dict = {}
-
-	for i in range(BOARDWIDTH * BOARDHEIGHT):
-		img_location = dirpath + '/temp/' + str(i+1) + '.' + img_ext
-		images_dict[i+1] = pygame.image.load(img_location)
-
-	return images_dict
-
+	return address
+
+
+def load_atlas(address):
+	"""Map a picture_slicer tile atlas and copy it into one surface in the
+	display's pixel format, so drawing tiles needs no conversion"""
+	with open(address, 'rb') as atlas_file:
+		atlas = mmap.mmap(atlas_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+	rows, cols, tile_width, tile_height, mode, offset = \
+			picture_slicer.read_atlas_header(atlas)
+	assert (tile_width, tile_height) == (TILESIZE, TILESIZE), \
+			"Tile atlas has the wrong tile size"
+
+	try:
+		data = memoryview(atlas)[offset:]
+	except TypeError:
+		data = buffer(atlas, offset) # Python 2's mmap has no memoryview
+
+	pixels = pygame.image.frombuffer(data,
+									 (cols * tile_width, rows * tile_height),
+									 mode)
+	if mode == 'RGBA':
+		return pixels.convert_alpha()
+	return pixels.convert()
 
 if __name__ == '__main__':
 	main()
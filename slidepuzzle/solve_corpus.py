@@ -0,0 +1,179 @@
+""" Corpus Solver
+
+	Solves a file of slide puzzle boards optimally across a pool of worker
+	processes and streams one JSON line per board as each one finishes.
+
+	Each input line is a board in row-major order with 0 for the blank,
+	e.g. "5 1 3 4 2 0 7 8 9 6 10 12 13 14 11 15" (commas work too). Blank
+	lines and lines starting with # are skipped. Output lines look like
+		{"board": "...", "length": 12, "moves": "ulldr...",
+		 "nodes": 3021, "seconds": 0.01}
+	with moves spelled with engine.LETTERS. Lines that aren't a solvable
+	board get {"board": "<the line>", "error": "..."} instead.
+
+	When the output file already exists, boards it already has results for
+	are skipped and new results are appended, so an interrupted run can
+	simply be started again.
+
+	Usage: python solve_corpus.py [boards.txt] [-o results.jsonl] [-j 4]
+"""
+import argparse, json, math, multiprocessing, os, sys, time
+
+import solver
+from engine import LETTERS
+
+_heuristics = {}
+
+
+def parse_board(line, width=None, height=None):
+	"""Turn one input line into (tiles, width, height), or None to skip it.
+
+	Raises ValueError for lines that aren't a solvable board.
+	"""
+	line = line.strip()
+	if not line or line.startswith('#'):
+		return None
+
+	tiles = tuple(int(value) for value in line.replace(',', ' ').split())
+	if width is None or height is None:
+		width = height = int(round(math.sqrt(len(tiles))))
+	if width * height != len(tiles) or \
+			sorted(tiles) != list(range(width * height)):
+		raise ValueError('Not a %dx%d board: %r' % (width, height, line))
+	if not solver.is_solvable(tiles, width, height):
+		raise ValueError('Board is not solvable: %r' % line)
+
+	return tiles, width, height
+
+
+def board_key(tiles):
+	return ' '.join(str(tile) for tile in tiles)
+
+
+def solve_one(task):
+	"""Worker: solve one board and return its result record"""
+	tiles, width, height = task
+	if (width, height) not in _heuristics:
+		# Keep one heuristic per size so its tables are built once a worker
+		_heuristics[(width, height)] = solver.get_heuristic(width, height)
+
+	started = time.time()
+	moves, nodes = solver.search(tiles, width, height,
+								 _heuristics[(width, height)])
+	return {'board': board_key(tiles),
+			'length': len(moves),
+			'moves': ''.join(LETTERS[move] for move in moves),
+			'nodes': nodes,
+			'seconds': round(time.time() - started, 4)}
+
+
+def read_finished(address):
+	"""Boards that already have a result in an earlier output file"""
+	finished = set()
+	if not address or not os.path.exists(address):
+		return finished
+
+	with open(address) as f:
+
+		for line in f:
+			try:
+				finished.add(json.loads(line)['board'])
+			except (ValueError, KeyError):
+				# A line cut short when the last run was stopped
+				continue
+
+	return finished
+
+
+def read_tasks(lines, finished, errors, width=None, height=None):
+	"""Yield the boards from lines that still need solving.
+
+	Lines that aren't a solvable board are added to errors as error records.
+	"""
+	seen = set(finished)
+
+	for line in lines:
+		try:
+			task = parse_board(line, width, height)
+		except ValueError as error:
+			key = line.strip()
+			if key not in seen:
+				seen.add(key)
+				errors.append({'board': key, 'error': str(error)})
+			continue
+		if task is None:
+			continue
+
+		key = board_key(task[0])
+		if key not in seen:
+			seen.add(key)
+			yield task
+
+
+def solve_corpus(lines, out, finished=(), workers=None, chunksize=4,
+				 width=None, height=None):
+	"""Solve the boards in lines on a process pool, writing JSON lines to out.
+
+	Results are written in the order they finish, with error records for
+	bad lines written as they are found. Returns how many boards were
+	solved.
+	"""
+	errors = [] # Filled by read_tasks as the pool reads the lines
+	tasks = read_tasks(lines, finished, errors, width, height)
+	pool = multiprocessing.Pool(workers)
+	solved = 0
+
+	def write(record):
+		out.write(json.dumps(record, sort_keys=True) + '\n')
+		out.flush()
+
+	try:
+		for result in pool.imap_unordered(solve_one, tasks, chunksize):
+			while errors:
+				write(errors.pop(0))
+			write(result)
+			solved += 1
+		pool.close()
+
+		for record in errors:
+			write(record)
+	except BaseException:
+		pool.terminate()
+		raise
+	finally:
+		pool.join()
+
+	return solved
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Solve a corpus of boards')
+	parser.add_argument('input', nargs='?', help='board file (default stdin)')
+	parser.add_argument('-o', '--output',
+						help='JSON lines file to append to (default stdout)')
+	parser.add_argument('-j', '--workers', type=int,
+						help='worker processes (default one per core)')
+	parser.add_argument('-c', '--chunksize', type=int, default=4,
+						help='boards handed to a worker at a time')
+	parser.add_argument('--width', type=int)
+	parser.add_argument('--height', type=int)
+	args = parser.parse_args()
+
+	finished = read_finished(args.output)
+	lines = open(args.input) if args.input else sys.stdin
+	out = open(args.output, 'a') if args.output else sys.stdout
+	started = time.time()
+
+	try:
+		solved = solve_corpus(lines, out, finished, args.workers,
+							  args.chunksize, args.width, args.height)
+	finally:
+		if args.output:
+			out.close()
+
+	sys.stderr.write('solved %d boards in %.1fs (%d already done)\n'
+					 % (solved, time.time() - started, len(finished)))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,323 @@
+""" Slide Puzzle Solver
+
+	Finds an optimal sequence of slides for a slide puzzle board using
+	IDA* search with a Manhattan distance plus linear conflict heuristic, or
+	an additive pattern database (see pattern_db.py) when one has been built
+	for the board size.
+
+	Hard 4x4 boards only solve in well under a second with the 4x4 pattern
+	database, which is not shipped and takes around twenty minutes to make
+	(python pattern_db.py 4 4). Without it the Manhattan heuristic can take
+	seconds to minutes on a random deal; search's max_nodes lets callers
+	give up and fall back to realtime_solver, as background_solve.py does.
+
+	Boards are the lists of columns used by slidepuzzle.py. Internally the
+	search works on a flat row-major list of tile numbers with 0 for the
+	blank, so tile t belongs at index t - 1 and the blank at the last index.
+"""
+from operator import itemgetter
+
+import pattern_db
+
+UP = 'up'
+DOWN = 'down'
+LEFT = 'left'
+RIGHT = 'right'
+
+FOUND = -1
+GAVEUP = -2
+
+
+def board_to_tiles(board):
+	"""Flattens a board of columns into a row-major tuple with 0 for blank"""
+	width = len(board)
+	height = len(board[0])
+	return tuple(board[x][y] or 0 for y in range(height) for x in range(width))
+
+
+def tiles_to_board(tiles, width, height):
+	"""Turns a row-major tuple back into a board of columns"""
+	board = []
+
+	for x in range(width):
+		board.append([tiles[y * width + x] or None for y in range(height)])
+
+	return board
+
+
+def goal_tiles(width, height):
+	"""Return the solved row-major tuple for a width x height board"""
+	return tuple(range(1, width * height)) + (0,)
+
+
+def is_solvable(tiles, width, height):
+	"""Checks the permutation parity against the blank's distance from home"""
+	size = width * height
+	values = [tile or size for tile in tiles]
+	inversions = 0
+
+	for i in range(size):
+
+		for j in range(i + 1, size):
+			if values[i] > values[j]:
+				inversions += 1
+
+	blank = list(tiles).index(0)
+	distance = (width - 1 - blank % width) + (height - 1 - blank // width)
+	return inversions % 2 == distance % 2
+
+
+def get_neighbours(width, height):
+	"""For every blank index, list the (new blank index, move) pairs.
+
+	The move is named after the direction the tile slides, as in
+	slidepuzzle.make_move, so UP moves the blank down a row.
+	"""
+	neighbours = []
+
+	for blank in range(width * height):
+		x, y = blank % width, blank // width
+		options = []
+		if y < height - 1:
+			options.append((blank + width, UP))
+		if y > 0:
+			options.append((blank - width, DOWN))
+		if x < width - 1:
+			options.append((blank + 1, LEFT))
+		if x > 0:
+			options.append((blank - 1, RIGHT))
+		neighbours.append(tuple(options))
+
+	return neighbours
+
+
+def apply_moves(tiles, width, moves):
+	"""Return the row-major tuple reached by playing moves on tiles"""
+	offsets = {UP: width, DOWN: -width, LEFT: 1, RIGHT: -1}
+	tiles = list(tiles)
+	blank = tiles.index(0)
+
+	for move in moves:
+		new_blank = blank + offsets[move]
+		tiles[blank], tiles[new_blank] = tiles[new_blank], 0
+		blank = new_blank
+
+	return tuple(tiles)
+
+
+def _longest_increasing(values):
+	"""Length of the longest strictly increasing subsequence"""
+	best = []
+
+	for value in values:
+		length = 1
+
+		for i in range(len(best)):
+			if values[i] < value and best[i] + 1 > length:
+				length = best[i] + 1
+		best.append(length)
+
+	return max(best) if best else 0
+
+
+class ManhattanConflict(object):
+	"""Manhattan distance plus linear conflicts, updated one move at a time.
+
+	start() primes the per-line conflict counts for a position. After the
+	search slides a tile, apply() returns the change in the estimate and
+	revert() undoes the bookkeeping when the search backs out of the move.
+	"""
+
+	def __init__(self, width, height):
+		self.width = width
+		self.height = height
+		size = width * height
+
+		self.distance = [[0] * size for tile in range(size)]
+		for tile in range(1, size):
+			goalx, goaly = (tile - 1) % width, (tile - 1) // width
+
+			for pos in range(size):
+				self.distance[tile][pos] = abs(pos % width - goalx) + \
+										   abs(pos // width - goaly)
+
+		self.goal_row = [0] + [(tile - 1) // width for tile in range(1, size)]
+		self.goal_col = [0] + [(tile - 1) % width for tile in range(1, size)]
+		self._row_items = [itemgetter(*range(y * width, (y + 1) * width))
+						   for y in range(height)]
+		self._col_items = [itemgetter(*range(x, size, width))
+						   for x in range(width)]
+		self._row_cache = [{} for y in range(height)]
+		self._col_cache = [{} for x in range(width)]
+		self._row_conflicts = [0] * height
+		self._col_conflicts = [0] * width
+		self._undo = []
+
+	def row_conflict(self, tiles, y):
+		"""Extra moves needed by tiles sharing their goal row y"""
+		key = self._row_items[y](tiles)
+		cache = self._row_cache[y]
+		value = cache.get(key)
+		if value is None:
+			goals = [self.goal_col[tile] for tile in key
+					 if tile and self.goal_row[tile] == y]
+			value = 2 * (len(goals) - _longest_increasing(goals))
+			cache[key] = value
+		return value
+
+	def col_conflict(self, tiles, x):
+		"""Extra moves needed by tiles sharing their goal column x"""
+		key = self._col_items[x](tiles)
+		cache = self._col_cache[x]
+		value = cache.get(key)
+		if value is None:
+			goals = [self.goal_row[tile] for tile in key
+					 if tile and self.goal_col[tile] == x]
+			value = 2 * (len(goals) - _longest_increasing(goals))
+			cache[key] = value
+		return value
+
+	def estimate(self, tiles):
+		"""Full (non-incremental) estimate for a row-major position"""
+		total = 0
+
+		for pos, tile in enumerate(tiles):
+			if tile:
+				total += self.distance[tile][pos]
+
+		for y in range(self.height):
+			total += self.row_conflict(tiles, y)
+
+		for x in range(self.width):
+			total += self.col_conflict(tiles, x)
+
+		return total
+
+	def start(self, tiles):
+		"""Prime the incremental state for tiles and return its estimate"""
+		self._row_conflicts = [self.row_conflict(tiles, y)
+							   for y in range(self.height)]
+		self._col_conflicts = [self.col_conflict(tiles, x)
+							   for x in range(self.width)]
+		del self._undo[:]
+		return self.estimate(tiles)
+
+	def apply(self, tiles, tile, src, dst):
+		"""Return the estimate change after tile slid from src to dst"""
+		width = self.width
+		delta = self.distance[tile][dst] - self.distance[tile][src]
+
+		# Only the line the tile belongs to can gain or lose a conflict,
+		# and only when the slide carries the tile into or out of it
+		if src // width == dst // width:
+			line = self.goal_col[tile]
+			if line != src % width and line != dst % width:
+				self._undo.append(None)
+				return delta
+			lines = self._col_conflicts
+			new = self.col_conflict(tiles, line)
+		else:
+			line = self.goal_row[tile]
+			if line != src // width and line != dst // width:
+				self._undo.append(None)
+				return delta
+			lines = self._row_conflicts
+			new = self.row_conflict(tiles, line)
+
+		old = lines[line]
+		lines[line] = new
+		self._undo.append((lines, line, old))
+		return delta + new - old
+
+	def revert(self):
+		"""Undo the most recent apply()"""
+		change = self._undo.pop()
+		if change is not None:
+			lines, line, old = change
+			lines[line] = old
+
+
+def get_heuristic(width, height):
+	"""Pattern database for the board size if built, else Manhattan"""
+	database = pattern_db.load(width, height)
+	if database is None:
+		return ManhattanConflict(width, height)
+	return database
+
+
+def search(tiles, width, height, heuristic=None, max_moves=None,
+		   max_nodes=None):
+	"""IDA* from a row-major position to the goal.
+
+	Returns (moves, nodes expanded). Moves that would slide the last tile
+	straight back are never generated. With max_moves, gives up once the
+	board is known to need more than that, and with max_nodes once more
+	than that many nodes have been expanded; either way moves is None.
+	"""
+	tiles = list(tiles)
+	if not is_solvable(tiles, width, height):
+		raise ValueError('Board is not solvable')
+
+	if heuristic is None:
+		heuristic = get_heuristic(width, height)
+	neighbours = get_neighbours(width, height)
+	apply = heuristic.apply
+	revert = heuristic.revert
+	path = []
+	nodes = [0]
+
+	def dfs(blank, previous, g, h, bound):
+		if h == 0:
+			return FOUND
+
+		nodes[0] += 1
+		if max_nodes is not None and nodes[0] > max_nodes:
+			return GAVEUP
+		lowest = None
+
+		for new_blank, move in neighbours[blank]:
+			if new_blank == previous:
+				continue
+
+			tile = tiles[new_blank]
+			tiles[blank] = tile
+			tiles[new_blank] = 0
+			new_h = h + apply(tiles, tile, new_blank, blank)
+			cost = g + 1 + new_h
+
+			if cost <= bound:
+				path.append(move)
+				cost = dfs(new_blank, blank, g + 1, new_h, bound)
+				if cost == FOUND or cost == GAVEUP:
+					return cost
+				path.pop()
+
+			revert()
+			tiles[new_blank] = tile
+			tiles[blank] = 0
+			if lowest is None or cost < lowest:
+				lowest = cost
+
+		return lowest
+
+	blank = tiles.index(0)
+	estimate = heuristic.start(tiles)
+	bound = estimate
+
+	while max_moves is None or bound <= max_moves:
+		result = dfs(blank, None, 0, estimate, bound)
+		if result == FOUND:
+			return path, nodes[0]
+		if result == GAVEUP:
+			break
+		bound = result
+
+	return None, nodes[0]
+
+
+def solve(board, heuristic=None):
+	"""Return an optimal list of moves that solves a board of columns"""
+	width = len(board)
+	height = len(board[0])
+	moves, nodes = search(board_to_tiles(board), width, height, heuristic)
+	return moves
@@ -0,0 +1,91 @@
+""" Tile Cache
+
+	Keeps prepared (resized and cropped) puzzle pictures on disk, as
+	picture_slicer tile atlases, so a picture only goes through
+	picture_slicer the first time it is used. Entries are named after a
+	hash of the source file's contents and the board geometry, so editing
+	or replacing the picture, or changing the tile size or board size,
+	simply misses the cache. Once the cache grows past its size cap the
+	least recently used entries are deleted.
+"""
+import hashlib, os
+
+import picture_slicer
+
+dirpath = os.path.abspath(os.path.dirname(__file__))
+
+CACHEDIR = os.path.join(dirpath, 'cache')
+MAXCACHEBYTES = 64 * 1024 * 1024
+EXTENSION = '.atlas' # Raw pixels: lossless, and nothing to decode
+
+
+def get_key(address, tile_size, board_width, board_height):
+	"""Cache key for a picture file prepared for a board"""
+	digest = hashlib.sha1()
+
+	with open(address, 'rb') as picture_file:
+		for block in iter(lambda: picture_file.read(1 << 16), b''):
+			digest.update(block)
+
+	digest.update(('%d:%d:%d' % (tile_size, board_width,
+								 board_height)).encode('ascii'))
+	return digest.hexdigest()
+
+
+def get_path(key, cache_dir=CACHEDIR):
+	return os.path.join(cache_dir, key + EXTENSION)
+
+
+def lookup(key, cache_dir=CACHEDIR):
+	"""Path of the cached picture for key, or None.
+
+	A hit marks the entry as recently used.
+	"""
+	path = get_path(key, cache_dir)
+	try:
+		os.utime(path, None)
+	except OSError:
+		return None
+	return path
+
+
+def store(key, picture, rows, cols, cache_dir=CACHEDIR,
+		  max_bytes=MAXCACHEBYTES):
+	"""Save a prepared PIL picture of rows x cols tiles under key and
+	return its path"""
+	if not os.path.exists(cache_dir):
+		os.makedirs(cache_dir)
+
+	path = get_path(key, cache_dir)
+	# Write to the side first so a half-written file is never a hit
+	temp_path = '%s.%d.tmp' % (path, os.getpid())
+	picture_slicer.save_atlas(picture, rows, cols, temp_path)
+	os.rename(temp_path, path)
+
+	prune(cache_dir, max_bytes)
+	return path
+
+
+def prune(cache_dir=CACHEDIR, max_bytes=MAXCACHEBYTES):
+	"""Delete least recently used entries until the cache fits max_bytes"""
+	entries = []
+
+	for name in os.listdir(cache_dir):
+		if name.endswith(EXTENSION):
+			path = os.path.join(cache_dir, name)
+			try:
+				info = os.stat(path)
+			except OSError:
+				continue # Removed by someone else meanwhile
+			entries.append((info.st_mtime, info.st_size, path))
+
+	total = sum(size for used, size, path in entries)
+
+	for used, size, path in sorted(entries):
+		if total <= max_bytes:
+			break
+		try:
+			os.remove(path)
+		except OSError:
+			pass
+		total -= size
@@ -0,0 +1,160 @@
+""" Vector Environment
+
+	Steps many slide puzzle boards at once with NumPy, for rollouts and
+	agent training where one make_move call per board is far too slow.
+
+	All boards live in one (count, width * height) uint8 array, row-major
+	with 0 for the blank as in solver.py, next to a vector of blank
+	indices. Actions are indexes into ACTIONS. Which actions are valid from
+	each blank index is worked out once with engine.is_valid_move, so the
+	batch follows exactly the same rules as the game.
+
+	Run this file to time board-steps per second.
+"""
+import time
+
+import numpy as np
+
+import engine
+from engine import UP, DOWN, LEFT, RIGHT
+
+ACTIONS = (UP, DOWN, LEFT, RIGHT)
+
+
+def get_move_tables(width, height):
+	"""(valid, target) arrays indexed by [blank index, action].
+
+	target is where the blank ends up, or the blank index itself when the
+	action is not allowed, so invalid actions step in place.
+	"""
+	size = width * height
+	offsets = {UP: width, DOWN: -width, LEFT: 1, RIGHT: -1}
+	valid = np.zeros((size, len(ACTIONS)), dtype=bool)
+	target = np.zeros((size, len(ACTIONS)), dtype=np.intp)
+
+	for blank in range(size):
+		board = [[1] * height for x in range(width)]
+		board[blank % width][blank // width] = None
+
+		for action, move in enumerate(ACTIONS):
+			valid[blank, action] = engine.is_valid_move(board, move)
+			target[blank, action] = blank + offsets[move] \
+									if valid[blank, action] else blank
+
+	return valid, target
+
+
+def get_distance_table(width, height):
+	"""Manhattan distance of every tile from every cell, 0 for the blank"""
+	size = width * height
+	cells = np.arange(size)
+	goals = np.arange(-1, size - 1)
+	distance = np.abs(cells[None, :] % width - goals[:, None] % width) + \
+			   np.abs(cells[None, :] // width - goals[:, None] // width)
+	distance[0] = 0
+	return distance.astype(np.int32)
+
+
+class BoardBatch(object):
+	"""count boards of one size, stepped together"""
+
+	def __init__(self, count, width=4, height=4):
+		self.count = count
+		self.width = width
+		self.height = height
+		self.size = width * height
+		self.goal = np.array(engine.goal_tiles(width, height), dtype=np.uint8)
+		self._valid, self._target = get_move_tables(width, height)
+		self._distance = get_distance_table(width, height)
+		self._rows = np.arange(count)
+		self._cells = np.arange(self.size)
+		self.reset()
+
+	def reset(self):
+		"""Put every board back to solved"""
+		self.tiles = np.tile(self.goal, (self.count, 1))
+		self.blank = np.full(self.count, self.size - 1, dtype=np.intp)
+		self.manhattan = np.zeros(self.count, dtype=np.int32)
+
+	def set_tiles(self, tiles):
+		"""Load a (count, size) array of row-major boards"""
+		self.tiles = np.array(tiles, dtype=np.uint8).reshape(self.count,
+															  self.size)
+		self.blank = np.argmin(self.tiles, axis=1).astype(np.intp)
+		self.manhattan = self.get_manhattan()
+
+	def shuffle(self, rng=None):
+		"""Deal every board a uniformly random solvable position.
+
+		As in scrambler.random_tiles, unsolvable shuffles have their first
+		two tiles swapped, which keeps the draw uniform.
+		"""
+		if rng is None:
+			rng = np.random.RandomState()
+		order = np.argsort(rng.random_sample((self.count, self.size)), axis=1)
+		tiles = self.goal[order]
+		values = np.where(tiles == 0, self.size, tiles)
+		inversions = np.triu(values[:, :, None] > values[:, None, :]).sum(
+			axis=(1, 2))
+		blank = np.argmin(tiles, axis=1)
+		distance = (self.width - 1 - blank % self.width) + \
+				   (self.height - 1 - blank // self.width)
+		bad = np.nonzero(inversions % 2 != distance % 2)[0]
+
+		# The first two cells that are not the blank
+		first = np.where(blank[bad] == 0, 1, 0)
+		second = np.where(blank[bad] <= 1, 2, 1)
+		tiles[bad, first], tiles[bad, second] = \
+			tiles[bad, second], tiles[bad, first]
+		self.set_tiles(tiles)
+
+	def valid_mask(self):
+		"""(count, 4) booleans: which ACTIONS each board may take"""
+		return self._valid[self.blank]
+
+	def step(self, actions):
+		"""Apply one action per board and return which of them were valid.
+
+		Invalid actions leave their board unchanged.
+		"""
+		rows = self._rows
+		blank = self.blank
+		valid = self._valid[blank, actions]
+		new_blank = self._target[blank, actions]
+		moved = self.tiles[rows, new_blank]
+		distance = self._distance
+		self.manhattan += distance[moved, blank] - distance[moved, new_blank]
+		self.tiles[rows, blank] = moved
+		self.tiles[rows, new_blank] = 0
+		self.blank = new_blank
+		return valid
+
+	def solved(self):
+		"""(count,) booleans; a board is solved when no tile is out of place"""
+		return self.manhattan == 0
+
+	def get_manhattan(self):
+		"""Recompute the Manhattan distance of every board from scratch"""
+		return self._distance[self.tiles, self._cells].sum(axis=1).astype(
+			np.int32)
+
+
+def benchmark(count=100000, steps=200, width=4, height=4):
+	"""Time random valid actions on a batch of boards"""
+	batch = BoardBatch(count, width, height)
+	rng = np.random.RandomState(0)
+	batch.shuffle(rng)
+	choices = rng.randint(0, len(ACTIONS), size=(steps, count))
+
+	started = time.time()
+	for actions in choices:
+		batch.step(actions)
+	elapsed = time.time() - started
+
+	assert (batch.manhattan == batch.get_manhattan()).all()
+	print('%.1f million board-steps per second'
+		  % (count * steps / elapsed / 1e6))
+
+
+if __name__ == '__main__':
+	benchmark()